@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-usage: pms [-h] [-j | -c | -a [width]] searchterm
+usage: pms [-h] [-o | -q | -f] [-u] [--timings] [--daemon]
+           [-j | -c | -a [width] | -i] [searchterm]
 
 Search for packages with pacman or apt and show results in an interactive list.
 Installed packages are highlighted/marked and available updates are shown as
@@ -10,6 +11,9 @@ well.
 - scroll through the results using arrow keys, PageUp/PageDown, Home/End
 - show package info (F1)
 - show package file list (F2)
+- rank results by a fuzzy match of the searchterm, like fzf (F3)
+- start a new search (F4). Results are shown while they arrive, Esc stops.
+- filter the list while typing (/), Esc removes the filter
 - hit Return to install an uninstalled package or uninstall an installed one
 - use Spacebar to de/select several packages to (de)install, Return to do it.
 - update all needed package-databases (F5)
@@ -26,6 +30,28 @@ positional arguments:
 
 options:
   -h, --help            show this help message and exit
+  -o, --owns            searchterm is a path or glob (e.g. /usr/bin/ls or
+                        *.desktop): list packages owning matching files.
+                        Wildcards don't match "/". Can be combined with other
+                        options.
+  -q, --query           searchterm is a query like `name:^python repo:extra
+                        installed`: name:, desc:, repo:, group: (regexes),
+                        installed, outdated, combined with AND (or a space),
+                        OR, NOT and parentheses.
+  -f, --fuzzy           rank packages by a fuzzy match of searchterm (its
+                        characters in this order), like fzf. Only the best
+                        matches are shown.
+  -u, --outdated        only list installed packages with a newer version
+                        available. The searchterm is optional here. Can be
+                        combined with -q or -f.
+  --timings             print time spent and number of calls per stage
+                        (running programs, searching, formatting, ...) to
+                        stderr when done. Same as setting PMS_TIMINGS=table,
+                        PMS_TIMINGS=json prints them as JSON.
+  --daemon              keep the package databases in memory and answer
+                        searches of other calls (except interactive ones) on a
+                        unix socket, until interrupted. They will use it on
+                        their own.
   -j, --json            output result as JSON
   -c, --csv             output result as tab-separated table
   -a [width], --ansi [width]
@@ -38,14 +64,15 @@ import os
 import re
 import io
 import sys
-import json
+import time
 import shlex
-import curses
 import argparse
+import functools
 import threading
 import subprocess
-import concurrent.futures
-from collections import namedtuple
+# curses, json, asyncio and concurrent.futures take a while to import. They
+# are imported where needed, so only modes using them have to wait.
+from collections import namedtuple, OrderedDict
 
 
 #┌─────────────────────────────────────────────────────────────────────────────┐
@@ -55,6 +82,9 @@ class Style:
     ext_str = "Foreign"     # string to show in db-column for external packages
     min_desc = 30           # minimal width of description-column
     scroll_padding = 5      # number of lines kept visible below/above cursor
+    max_fps = 60            # max. number of frames per second in interactive mode
+    prefetch = 2            # prefetch info/files for n rows above/below cursor
+    jump_scroll = 0.03      # use jump-scroll if drawing a frame takes longer (seconds)
 
     # colors/formatting.
     header  = "40;97;4;1"   # bold white underline on black background (full CSI-Sequence)
@@ -69,6 +99,7 @@ class Style:
     ver     = 6             # version
     ins     = 2 #10         # installed package
     old     = 9             # old version
+    unsat   = 1             # installed dependency, but its version doesn't fit
     desc    = 7             # description
 
     # hightlight match. Only use one of:
@@ -100,6 +131,7 @@ class Style256(Style):
     selected   = "1;48;5;22", "1;48;5;52"
     pkg        = 15
     ins        = 10
+    unsat      = 208
     infobg     = 18
     infoborder = 30
     footerbg   = 18
@@ -111,22 +143,18 @@ class Style256(Style):
 #┌─────────────────────────────────────────────────────────────────────────────┐
 #│                              HELPER FUNCTIONS                               │
 #└─────────────────────────────────────────────────────────────────────────────┘
+@functools.lru_cache(maxsize=64)
+def wraprx(w):
+    """
+    regex for wrap(): as many words as fit into w (the longest run ending
+    before a space), or else w characters of a word that's too long.
+    """
+    return re.compile(rf"\S.{{0,{w - 1}}}(?= |$)|\S{{{w}}}")
+
+
 def wrap(s, w):
-    """a simpler but 10x faster replacement for textwrap.wrap"""
-    line_len, line_buf = 0, []
-    for word in s.split():
-        # If appending the word would cause overflow, flush the line.
-        if line_len + len(line_buf) + len(word) > w and line_buf:
-            yield ' '.join(line_buf)
-            line_len, line_buf = 0, []
-        # If just this word alone would overflow, break it by force.
-        while len(word) > w:
-            yield word[:w]
-            word = word[w:]
-        line_buf.append(word)
-        line_len += len(word)
-    if line_buf:
-        yield ' '.join(line_buf)
+    """a simpler but 20x faster replacement for textwrap.wrap"""
+    return wraprx(w).findall(" ".join(s.split()))
 
 
 def wrapml(s, w):
@@ -142,6 +170,55 @@ def byte2hr(size):  # binary prefixes
     return f'{size/(1<<10*f):.2f} {" KMGTPEZY"[f]}iB'
 
 
+class Timer:
+    """
+    Wall- and CPU-time (of the whole process) and number of calls per stage,
+    if Timer.enabled (see --timings). Use as context manager, `with
+    Timer("stage"): ...`, or as decorator, `@Timer("stage")`. Stages may
+    be nested, e.g. "cmd" is part of "search".
+    """
+    enabled = False
+    stages = {}     # stage => [calls, wall, cpu]
+    _lock = threading.Lock()
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._started = None
+
+    def __enter__(self):
+        if self.enabled: self._started = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        if self._started is None: return
+        wall, cpu = self._started
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        with Timer._lock:
+            st = Timer.stages.setdefault(self.stage, [0, 0.0, 0.0])
+            st[0] += 1; st[1] += wall; st[2] += cpu
+
+    def __call__(self, fun):
+        stage = self.stage
+        @functools.wraps(fun)
+        def timed(*args, **kwargs):
+            if not Timer.enabled: return fun(*args, **kwargs)
+            with Timer(stage): return fun(*args, **kwargs)
+        return timed
+
+    @staticmethod
+    def report(fmt="table"):
+        """write the timings to stderr, as a table or as JSON (fmt="json")"""
+        if fmt == "json":
+            import json
+            json.dump({k: dict(calls=c, wall=w, cpu=u) for k, (c, w, u) in Timer.stages.items()}, sys.stderr)
+            sys.stderr.write("\n")
+            return
+        sys.stderr.write(f"{'stage':<16} {'calls':>6} {'wall ms':>10} {'cpu ms':>10}\n")
+        for k, (c, w, u) in sorted(Timer.stages.items(), key=lambda x: -x[1][1]):
+            sys.stderr.write(f"{k:<16} {c:>6} {w * 1000:>10.1f} {u * 1000:>10.1f}\n")
+
+
+@Timer("cmd")
 def cmd(binary, args):
     """thin wrapper for calling a program and returning its output"""
     procrun = subprocess.run([binary] + args,
@@ -159,6 +236,62 @@ def cmd(binary, args):
     return procrun.stdout.splitlines()
 
 
+async def acmd(binary, args):
+    """
+    like cmd(), but yield the output in batches of lines as soon as they
+    arrive. Exitcode and stderr are ignored. The program is killed if the
+    consumer stops early (e.g. is cancelled).
+    """
+    import asyncio
+    proc = await asyncio.create_subprocess_exec(binary, *args,
+        env=dict(os.environ, LC_ALL="C"),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        rest = b""
+        while chunk := await proc.stdout.read(65536):
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            yield [l.decode("utf-8", "replace") for l in lines]
+        if rest: yield [rest.decode("utf-8", "replace")]
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+async def amerge(*gens):
+    """yield the items of several async generators as they arrive"""
+    import asyncio
+    queue, done = asyncio.Queue(), object()
+    async def pump(gen):
+        try:
+            async for item in gen: queue.put_nowait(item)
+        finally:
+            queue.put_nowait(done)
+    tasks = [asyncio.create_task(pump(g)) for g in gens]
+    try:
+        running = len(tasks)
+        while running:
+            item = await queue.get()
+            if item is done: running -= 1
+            else: yield item
+        for t in tasks: await t     # raise exceptions, if any
+    finally:    # stop the others (killing their programs) before leaving
+        for t in tasks: t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def errlines(e):
+    """error message of a failed cmd() (or any other exception) as list of lines"""
+    if isinstance(e, subprocess.CalledProcessError):
+        err = [f"{e.cmd.split()[0]} returned exitcode {e.returncode}", ""]
+        return err + e.stdout.splitlines() + e.stderr.splitlines()
+    return str(e).splitlines()
+
+
 def sudocmd(binary, args):
     """interactive command with sudo"""
     os.system(shlex.join(["sudo", binary] + args))
@@ -175,6 +308,35 @@ def checkcmd(binary):
     except: return False
 
 
+def pkgmanager(binaries=("apt", "pacman")):
+    """
+    The one of binaries which is available and working, None if it's not
+    exactly one. They are looked up in PATH first, only those found are
+    probed with checkcmd(). The probe's result is kept in a cache-file as
+    long as the binaries don't change: a line with the key, one with the
+    working binaries (plain text, json takes a while to import).
+    """
+    import shutil
+    found = [b for b in binaries if shutil.which(b)]
+    try:
+        key = repr(filekey(shutil.which(b) for b in found))
+    except OSError:
+        key = None
+    path = cachefile("pkgmanager")
+    try:
+        with open(path) as f: cached = f.read().split("\n")
+        if len(cached) == 3 and cached[0] == key: found = cached[1].split()
+        else: raise ValueError("stale")
+    except (OSError, ValueError):
+        found = [b for b in found if checkcmd(b)]
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f: f.write(f"{key}\n{' '.join(found)}\n")
+        except OSError:
+            pass
+    return found[0] if len(found) == 1 else None
+
+
 def csi(code=""): return f"\033[{code}m"
 
 
@@ -197,9 +359,41 @@ def hl(string="", code=1):
     return csi(code) + string + csi(f"2{code if code != 1 else 2}")
 
 
+ANSIRX = re.compile("\033\\[.*?m")
+
 def alen(astr):
     """calculate length of string, ignoring ANSI-colorcodes"""
-    return len(re.sub("\033\\[.*?m", "", astr))
+    return len(ANSIRX.sub("", astr))
+
+
+def escapes(fun, *args):
+    """(prefix, suffix) fun() wraps a string in, e.g. escapes(fg, 3)"""
+    return tuple(fun("\0", *args).split("\0"))
+
+
+def mark(s, spans, on, off):
+    """wrap the (start, end)-spans of s in on/off, e.g. escapes(hl)"""
+    if not spans: return s
+    res, last = [], 0
+    for a, b in spans:
+        res += (s[last:a], on, s[a:b], off)
+        last = b
+    res.append(s[last:])
+    return "".join(res)
+
+
+def clip(text, pieces, spans):
+    """
+    spans of text, split up for pieces: consecutive substrings of text, only
+    separated by whitespace (like the lines of wrap()). Yields the spans
+    relative to each piece.
+    """
+    pos = 0
+    for p in pieces:
+        pos = text.find(p, pos)
+        end = pos + len(p)
+        yield [(max(a, pos) - pos, min(b, end) - pos) for a, b in spans if a < end and b > pos]
+        pos = end
 
 
 def columnize(lst, width=80, height=None):
@@ -240,22 +434,726 @@ def columnize(lst, width=80, height=None):
 
 
 
+class Fenwick:
+    """
+    Fenwick tree (binary indexed tree) over a list of numbers, e.g. row
+    heights: prefix sums, updates and finding the entry which contains a
+    given position are all O(log n).
+    """
+    def __init__(self, values):
+        self.values = list(values)
+        self.total = sum(self.values)
+        n = len(self.values)
+        self.tree = [0] + self.values
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n: self.tree[j] += self.tree[i]
+
+
+    def __len__(self): return len(self.values)
+
+
+    def copy(self):
+        new = Fenwick.__new__(Fenwick)
+        new.values, new.tree, new.total = self.values[:], self.tree[:], self.total
+        return new
+
+
+    def prefix(self, i):
+        """sum of the first i values"""
+        res = 0
+        while i > 0:
+            res += self.tree[i]
+            i -= i & -i
+        return res
+
+
+    def update(self, i, value):
+        """set values[i] to value"""
+        delta = value - self.values[i]
+        if not delta: return
+        self.values[i] = value
+        self.total += delta
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+
+    def find(self, pos):
+        """
+        index of the entry containing position pos, i.e. the largest i with
+        prefix(i) <= pos. Returns len(self) if pos is beyond total.
+        """
+        i, step = 0, 1 << len(self.values).bit_length()
+        while step:
+            if i + step < len(self.tree) and self.tree[i + step] <= pos:
+                i += step
+                pos -= self.tree[i]
+            step >>= 1
+        return i
+
+
+
+#┌─────────────────────────────────────────────────────────────────────────────┐
+#│                          NATIVE DATABASE ACCESS                             │
+#└─────────────────────────────────────────────────────────────────────────────┘
+def decompress(data):
+    """
+    decompress gzip, bzip2, xz, zstd or lz4 data (autodetected by magic
+    bytes). Anything else is returned unchanged.
+    """
+    if data[:2] == b"\x1f\x8b":
+        import gzip
+        return gzip.decompress(data)
+    if data[:3] == b"BZh":
+        import bz2
+        return bz2.decompress(data)
+    if data[:6] == b"\xfd7zXZ\x00":
+        import lzma
+        return lzma.decompress(data)
+    if data[:4] == b"\x28\xb5\x2f\xfd":
+        try:
+            import zstandard
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        except ImportError:     # no python-module, use the binary instead
+            return subprocess.run(["zstd", "-dcq"], input=data,
+                                  capture_output=True, check=True).stdout
+    if data[:4] == b"\x04\x22\x4d\x18":
+        try:
+            import lz4.frame
+            return lz4.frame.decompress(data)
+        except ImportError:
+            return subprocess.run(["lz4", "-dcq"], input=data,
+                                  capture_output=True, check=True).stdout
+    return data
+
+
+def untar(data):
+    """
+    minimal tar-reader: yield (name, content) of all regular files in an
+    (uncompressed) archive. Several times faster than tarfile, since we skip
+    everything we don't need.
+    """
+    pos, longname = 0, None
+    while pos + 512 <= len(data):
+        hdr = data[pos:pos + 512]
+        if not hdr.strip(b"\0"): break      # end of archive
+        size = int(hdr[124:136].strip(b"\0 ") or b"0", 8)
+        body = data[pos + 512:pos + 512 + size]
+        pos += 512 + (size + 511) // 512 * 512
+        typ = hdr[156:157]
+        if typ == b"L":                     # GNU long name
+            longname = body.rstrip(b"\0").decode()
+        elif typ == b"x":                   # pax header, only path is of interest
+            m = re.search(rb"\d+ path=([^\n]*)\n", body)
+            if m: longname = m.group(1).decode()
+        elif typ in (b"0", b"\0"):
+            if longname: name = longname
+            else:
+                name = hdr[:100].rstrip(b"\0").decode()
+                if hdr[257:262] == b"ustar" and hdr[345] != 0:
+                    name = hdr[345:500].rstrip(b"\0").decode() + "/" + name
+            longname = None
+            yield name, body
+        else:
+            longname = None
+
+
+def pacdesc(text):
+    """
+    parse the content of a pacman-database entry (desc, files) into a dict
+    of lists, e.g. {"NAME": ["bash"], "GROUPS": ["base", "base-devel"]}
+    """
+    d = {}
+    for block in text.split("\n\n"):
+        lines = block.strip("\n").split("\n")
+        if lines[0][:1] == "%":
+            d[lines[0].strip("%")] = lines[1:]
+    return d
+
+
+def debcontrol(text, fields):
+    """
+    parse paragraphs of a Debian control-file (Packages, dpkg status), yield
+    a dict of the wanted fields per paragraph. Only the first line of each
+    field is used (which is the summary for "Description").
+    """
+    rx = re.compile(r"^(%s): *(.*)$" % "|".join(map(re.escape, fields)), re.M)
+    for para in text.split("\n\n"):
+        d = dict(rx.findall(para))
+        if d: yield d
+
+
+@functools.lru_cache(maxsize=8192)
+def debverkey(version):
+    """
+    sort-key for Debian versions, same order as `dpkg --compare-versions`:
+    epoch, then upstream-version and revision compared in chunks of
+    non-digits (letters before other chars, "~" before everything, even
+    the end) and numbers.
+    """
+    def order(c):
+        if c == "~": return -1
+        return ord(c) if c.isalpha() else ord(c) + 256
+    def chunks(s):
+        return tuple((tuple(order(c) for c in alpha) + (0,), int(num or 0))
+                     for alpha, num in re.findall(r"(\D*)(\d*)", s))
+    epoch, _, version = version.partition(":") if ":" in version else ("0", "", version)
+    upstream, _, revision = version.rpartition("-") if "-" in version else (version, "", "0")
+    return int(epoch or 0), chunks(upstream), chunks(revision)
+
+
+def debvercmp(a, b):
+    """compare Debian versions: -1, 0 or 1"""
+    a, b = debverkey(a), debverkey(b)
+    return (a > b) - (a < b)
+
+
+def rpmvercmp(a, b):
+    """
+    compare version-strings like pacman (and rpm) do: -1, 0 or 1.
+    alphanumeric segments are compared one by one (numbers as numbers,
+    numbers are newer than letters), a longer separator wins, and a
+    remaining letter segment is older than nothing ("1.0a" < "1.0").
+    """
+    if a == b: return 0
+    alnum = lambda s, i: i < len(s) and s[i].isascii() and s[i].isalnum()
+    alpha = lambda c: c.isascii() and c.isalpha()
+    digit = lambda c: c.isascii() and c.isdigit()
+    i = j = 0
+    while i < len(a) and j < len(b):
+        si, sj = i, j
+        while i < len(a) and not alnum(a, i): i += 1
+        while j < len(b) and not alnum(b, j): j += 1
+        if i == len(a) or j == len(b): break
+        if i - si != j - sj: return -1 if i - si < j - sj else 1
+        isnum = digit(a[i])
+        pick = digit if isnum else alpha
+        ei, ej = i, j
+        while ei < len(a) and pick(a[ei]): ei += 1
+        while ej < len(b) and pick(b[ej]): ej += 1
+        if ej == j: return 1 if isnum else -1   # different types
+        x, y = a[i:ei], b[j:ej]
+        if isnum:
+            x, y = x.lstrip("0"), y.lstrip("0")
+            if len(x) != len(y): return 1 if len(x) > len(y) else -1
+        if x != y: return 1 if x > y else -1
+        i, j = ei, ej
+    if i == len(a) and j == len(b): return 0
+    # the final showdown: a remaining alpha-segment never beats the end
+    c1, c2 = a[i:i + 1], b[j:j + 1]
+    return -1 if (not c1 and not alpha(c2)) or alpha(c1) else 1
+
+
+@functools.lru_cache(maxsize=8192)
+def pacevr(version):
+    """split a pacman-version into epoch, pkgver and pkgrel (None if missing)"""
+    m = re.match(r"([0-9]*):", version)
+    epoch, version = (m.group(1) or "0", version[m.end():]) if m else ("0", version)
+    version, _, rel = version.rpartition("-") if "-" in version else (version, "", None)
+    return epoch, version, rel
+
+
+def vercmp(a, b):
+    """compare pacman-versions (epoch:pkgver-pkgrel) like `vercmp`: -1, 0 or 1"""
+    if a == b: return 0
+    (e1, v1, r1), (e2, v2, r2) = pacevr(a), pacevr(b)
+    return (rpmvercmp(e1, e2) or rpmvercmp(v1, v2) or
+            (rpmvercmp(r1, r2) if r1 is not None and r2 is not None else 0))
+
+
+def filekey(paths):
+    """key for cache invalidation: path, mtime and size of each file"""
+    key = []
+    for p in paths:
+        st = os.stat(p)
+        key.append([p, st.st_mtime_ns, st.st_size])
+    return key
+
+
+def cachefile(name):
+    """path of a file in our cache-directory"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "pms", name)
+
+
+def cache_write(name, key, sections, **meta):
+    """
+    Write a cache-file: a small JSON-header (key, metadata, offsets) followed
+    by binary sections (dict of name => bytes). The file is replaced
+    atomically, so readers which still have the old one mapped are safe.
+    Errors (e.g. read-only home) are ignored, the cache is optional.
+    """
+    import json
+    offsets, pos = {}, 0
+    for k, v in sections.items():
+        offsets[k] = (pos, len(v))
+        pos += len(v)
+    header = json.dumps({"key": key, "meta": meta, "sections": offsets}).encode()
+    path = cachefile(name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.{os.getpid()}", "wb") as f:
+            f.write(b"PMS\x01" + len(header).to_bytes(4, "little") + header)
+            for v in sections.values(): f.write(v)
+        os.replace(f"{path}.{os.getpid()}", path)
+    except OSError:
+        pass
+
+
+def cache_read(name, key):
+    """
+    Map a cache-file written by cache_write() into memory.
+    Returns (meta, dict of name => memoryview) or None if the file is missing
+    or the key does not match.
+    """
+    import mmap, json
+    try:
+        with open(cachefile(name), "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):     # ValueError: empty file
+        return None
+    if mm[:4] != b"PMS\x01": return None
+    hlen = int.from_bytes(mm[4:8], "little")
+    try:
+        header = json.loads(mm[8:8 + hlen])
+        if header["key"] != key: return None
+        data = memoryview(mm)[8 + hlen:]
+        return header["meta"], {k: data[o:o + l] for k, (o, l) in header["sections"].items()}
+    except (ValueError, KeyError, TypeError):   # corrupt or of an older version: missing
+        return None
+
+
+def table_dump(table):
+    """sections for cache_write() from a namedtuple of string-lists (one per column)"""
+    return {f: "\n".join(col).encode() for f, col in zip(table._fields, table)}
+
+
+def table_load(cls, sections, n):
+    """reverse of table_dump(): a MappedTable with the columns of cls"""
+    return MappedTable(cls._fields, sections, n)
+
+
+class MappedTable:
+    """
+    A table from a cache-file (see table_load()), used like the namedtuple
+    it was dumped from. A column is only decoded and split when it's used
+    first, the others stay in the mapped file: e.g. listing foreign
+    packages only needs the names.
+    """
+    def __init__(self, fields, sections, n):
+        self._fields, self._sections, self._n = fields, sections, n
+
+
+    def __getattr__(self, f):   # columns not decoded yet
+        if f not in self._fields: raise AttributeError(f)
+        col = str(self._sections[f], "utf-8").split("\n") if self._n else []
+        setattr(self, f, col)
+        return col
+
+
+    def __iter__(self):
+        return (getattr(self, f) for f in self._fields)
+
+
+def globrx(glob):
+    """regex for a glob (a path component or a whole path): wildcards never match a "/" """
+    rx, i = "", 0
+    while i < len(glob):
+        c = glob[i]
+        if c == "*": rx += "[^\n/]*"
+        elif c == "?": rx += "[^\n/]"
+        elif c == "[" and "]" in glob[i + 2:]:
+            end = glob.index("]", i + 2)
+            cls = glob[i + 1:end]
+            rx += "[" + ("^" + cls[1:] if cls[0] == "!" else cls).replace("\\", "\\\\") + "]"
+            i = end
+        else: rx += re.escape(c)
+        i += 1
+    return rx
+
+
+class FileIndex:
+    """
+    Compact index of the file lists of many packages, memory-mapped from a
+    cache-file. Each package has a block of its (sorted, absolute) paths:
+    directories and files in another directory than the previous entry are
+    stored as they are, files in the same directory only by their name
+    (shared prefix). Blocks start and end with "\n", so every entry can be
+    found by a regex in the whole mapped file.
+    """
+    def __init__(self, meta, sections):
+        self.repos = str(sections["repos"], "utf-8").split("\n")
+        self.names = str(sections["names"], "utf-8").split("\n")
+        self.offsets = sections["offsets"].cast("Q")
+        self.blob = sections["files"]
+        self.byname = {}
+        for i, name in enumerate(self.names):
+            self.byname.setdefault(name, []).append(i)
+
+
+    @staticmethod
+    def encode(paths):
+        """encode a list of paths to a block"""
+        cur, out = None, [""]
+        for p in sorted(paths):
+            if p.endswith("/"):
+                cur = p
+                out.append(p)
+            elif cur and p.startswith(cur) and "/" not in p[len(cur):]:
+                out.append(p[len(cur):])
+            else:
+                cur = p[:p.rindex("/") + 1]
+                out.append(p)
+        out.append("")
+        return "\n".join(out).encode()
+
+
+    @staticmethod
+    def decode(block):
+        """decode a block to a list of paths"""
+        cur, res = "", []
+        for e in str(block, "utf-8").strip("\n").split("\n"):
+            if "/" not in e: e = cur + e
+            else: cur = e[:e.rindex("/") + 1]
+            if e: res.append(e)
+        return res
+
+
+    @classmethod
+    def build(cls, name, key, entries):
+        """
+        write a new index from entries (iterable of (repo, pkgname, paths))
+        to cache-file name and return it.
+        """
+        repos, names, offsets, blocks, pos = [], [], [0], [], 0
+        for repo, pkgname, paths in entries:
+            block = cls.encode(paths)
+            repos.append(repo)
+            names.append(pkgname)
+            blocks.append(block)
+            pos += len(block)
+            offsets.append(pos)
+        from array import array
+        sections = {
+            "offsets": array("Q", offsets).tobytes(),
+            "repos": "\n".join(repos).encode(),
+            "names": "\n".join(names).encode(),
+            "files": b"".join(blocks),
+        }
+        cache_write(name, key, sections, n=len(names))
+        # in case the cache can't be written, keep it in memory
+        return cls.load(name, key) or cls({}, {k: memoryview(v) for k, v in sections.items()})
+
+
+    @classmethod
+    def load(cls, name, key):
+        """map index from cache-file, None if missing or outdated"""
+        cached = cache_read(name, key)
+        return cls(*cached) if cached else None
+
+
+    def block(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+
+    def files(self, name, prefer="local"):
+        """paths of a package (from repo prefer, if available) or None"""
+        idx = self.byname.get(name)
+        if not idx: return None
+        i = next((i for i in idx if self.repos[i] == prefer), idx[0])
+        return self.decode(self.block(i))
+
+
+    def owners(self, pattern):
+        """
+        find packages owning files which match pattern: an absolute path
+        or glob, or a filename (glob) without any "/". Like in pacman,
+        wildcards don't match "/": "usr/bin/*" finds nothing in subdirectories.
+        returns list of (repo, pkgname, matching paths)
+        """
+        from bisect import bisect_right
+        if "/" not in pattern:
+            base = pattern
+            full = re.compile(globrx(pattern)).fullmatch
+            match = lambda p: full(p.rsplit("/", 1)[-1])
+        else:
+            if not pattern.startswith("/"): pattern = "/" + pattern
+            base = pattern.rsplit("/", 1)[1] or "*"
+            match = re.compile(globrx(pattern)).fullmatch
+        # candidates: any entry whose last part matches, found in one pass
+        rx = re.compile(rb"(?m)^(?=[^\n])(?:[^\n]*/)?" + globrx(base).encode() + rb"$")
+        res, last = [], -1
+        for m in rx.finditer(self.blob):
+            i = bisect_right(self.offsets, m.start()) - 1
+            if i == last: continue
+            last = i
+            paths = [p for p in self.decode(self.block(i)) if not p.endswith("/") and match(p)]
+            if paths: res.append((self.repos[i], self.names[i], paths))
+        return res
+
+
+class TrigramIndex:
+    """
+    Index of all 3-character substrings (casefolded) of the texts of a table,
+    memory-mapped from a cache-file: for each trigram, the sorted list of
+    rows containing it. A regex can only match a row if the row contains
+    all literal strings the regex requires, so candidates() narrows a
+    search down to a few rows before the regex itself is run.
+    """
+    # casefold() misses these two, which match "i" with re.IGNORECASE: "ı" and "İ" (i + "\u0307")
+    fold = {0x131: "i", 0x307: None}
+
+    def __init__(self, meta, sections):
+        self.rows = meta["rows"]
+        self.grams = {g: k for k, g in enumerate(str(sections["grams"], "utf-8").split("\n"))}
+        self.offsets = sections["offsets"].cast("Q")
+        self.postings = sections["postings"].cast("I")
+
+
+    @classmethod
+    def build(cls, name, key, rows):
+        """
+        write a new index from rows (iterable of lists of texts, a regex must
+        match within one of them) to cache-file name and return it.
+        """
+        postings, n = {}, 0
+        for i, texts in enumerate(rows, 1):
+            grams = set()
+            for t in texts:
+                t = t.casefold().translate(cls.fold)
+                grams.update(t[j:j + 3] for j in range(len(t) - 2))
+            for g in grams:
+                if "\n" not in g: postings.setdefault(g, []).append(i - 1)
+            n = i
+        from array import array
+        grams, offsets, flat = sorted(postings), array("Q", [0]), array("I")
+        for g in grams:
+            flat.extend(postings[g])
+            offsets.append(len(flat))
+        sections = {
+            "grams": "\n".join(grams).encode(),
+            "offsets": offsets.tobytes(),
+            "postings": flat.tobytes(),
+        }
+        cache_write(name, key, sections, rows=n)
+        # in case the cache can't be written, keep it in memory
+        return cls.load(name, key) or cls({"rows": n}, {k: memoryview(v) for k, v in sections.items()})
+
+
+    @classmethod
+    def load(cls, name, key):
+        """map index from cache-file, None if missing or outdated"""
+        cached = cache_read(name, key)
+        return cls(*cached) if cached else None
+
+
+    @staticmethod
+    def literals(regex):
+        """
+        Literal strings required by a compiled regex: a list of alternatives,
+        each a list of (casefolded) strings which all have to be found in a
+        text matching the regex. None if there is nothing to narrow a search
+        down: e.g. "." or "ab|xyz" ("ab" is too short for a trigram).
+        """
+        try:
+            from re import _parser, _constants as sre
+        except ImportError:     # python < 3.11
+            import sre_parse as _parser, sre_constants as sre
+        if not isinstance(regex.pattern, str): return None
+        try:
+            parsed = _parser.parse(regex.pattern, regex.flags)
+        except Exception:
+            return None
+        limit = 32  # alternatives, more aren't worth it
+
+        def walk(items):
+            alts, run = [[]], ""
+            def combine(alts, sub):
+                if len(alts) * len(sub) > limit: return alts    # ignore sub
+                return [a + b for a in alts for b in sub]
+            for op, av in items:
+                if op is sre.LITERAL:
+                    run += chr(av)
+                    continue
+                if op is sre.AT: continue   # zero-width, the run goes on
+                alts, run = [a + [run] for a in alts], ""
+                if op is sre.SUBPATTERN:
+                    alts = combine(alts, walk(av[-1]))
+                elif op is sre.BRANCH:
+                    alts = combine(alts, [a for b in av[1] for a in walk(b)])
+                elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT) and av[0] > 0:
+                    alts = combine(alts, walk(av[2]))
+            return [a + [run] for a in alts]
+
+        res = []
+        for strings in walk(parsed):
+            strings = [s.casefold() for s in strings if len(s) >= 3 and s.isascii()]
+            if not strings: return None     # this alternative may match anything
+            res.append(strings)
+        return res
+
+
+    def candidates(self, alts):
+        """
+        sorted list of rows which may be matched, given the alternatives of
+        required strings (see literals()). None if the index doesn't help
+        (most rows are candidates anyway).
+        """
+        if alts is None: return None
+        res = set()
+        for strings in alts:
+            lists = []
+            for g in {s[j:j + 3] for s in strings for j in range(len(s) - 2)}:
+                k = self.grams.get(g)
+                if k is None:   # no row has it
+                    lists = []
+                    break
+                lists.append(self.postings[self.offsets[k]:self.offsets[k + 1]])
+            if not lists: continue
+            lists.sort(key=len)
+            found = set(lists[0])
+            for l in lists[1:]:
+                if not found: break
+                found.intersection_update(l)
+            res |= found
+            if len(res) > self.rows // 2: return None
+        return sorted(res)
+
+
+
 #┌─────────────────────────────────────────────────────────────────────────────┐
 #│                       PACKAGE LIST AND INFO, Generic                        │
 #└─────────────────────────────────────────────────────────────────────────────┘
+class Query:
+    """
+    Structured search: terms like `name:^python`, `desc:editor`, `repo:extra`,
+    `group:kde`, `installed` and `outdated` (or just a regex, which has to
+    match name or description), combined with AND (or just a space), OR, NOT
+    and parentheses. Values are case-insensitive regexes, quote them if they
+    contain spaces or parentheses: `desc:"text editor"`.
+    The query is compiled to a single function over the fields of a Pkg.Row
+    (match). Strings it requires in name and description (literals, see
+    TrigramIndex.literals()) narrow down searches, as well as a regex for
+    `pacman -Ss` (pattern). regex matches what to highlight.
+    outdated: tells if a row has a newer version available (Pkg.outdated).
+    """
+    fields = {"name": "r.pkg", "desc": "r.desc", "repo": "r.db", "group": "(r.grps or '')"}
+    flags = {"installed": "r.ins", "outdated": "outdated(r)"}
+    limit = 32  # alternatives of literals, see TrigramIndex.literals()
+
+    def __init__(self, text, outdated=None):
+        self._tokens = re.findall(r'[()]|(?:[^\s()"]|"[^"]*")+', text)
+        self._regexes, self._searched = {"outdated": outdated or Pkg.outdated}, []
+        src, self.literals = self._or()
+        if self._tokens: raise ValueError(f"query: unexpected »{self._tokens[0]}«")
+        self.match = eval(f"lambda r: bool({src})", self._regexes)
+        try:
+            self.regex = re.compile("|".join(f"(?:{p})" for p in self._searched) or "(?!)", re.IGNORECASE)
+        except re.error:    # e.g. inline flags, just don't highlight
+            self.regex = re.compile("(?!)")
+        self.pattern = "|".join(re.escape(max(a, key=len)) for a in self.literals) if self.literals else "."
+
+
+    def _peek(self): return self._tokens[0] if self._tokens else None
+
+
+    # each of these returns (python-expression, literals)
+    def _or(self):
+        src, lits = self._and()
+        while self._peek() == "OR":
+            self._tokens.pop(0)
+            s, l = self._and()
+            src = f"({src} or {s})"
+            lits = lits + l if lits is not None and l is not None and len(lits + l) <= self.limit else None
+        return src, lits
+
+
+    def _and(self):
+        src, lits = self._not()
+        while self._peek() not in (None, ")", "OR"):
+            if self._peek() == "AND": self._tokens.pop(0)
+            s, l = self._not()
+            src = f"({src} and {s})"
+            if lits is None: lits = l
+            elif l is not None and len(lits) * len(l) <= self.limit:
+                lits = [a + b for a in lits for b in l]
+        return src, lits
+
+
+    def _not(self):
+        if self._peek() != "NOT": return self._term()
+        self._tokens.pop(0)
+        return f"(not {self._not()[0]})", None
+
+
+    def _term(self):
+        if not self._tokens: raise ValueError("query: term expected")
+        tok = self._tokens.pop(0)
+        if tok == "(":
+            res = self._or()
+            if self._peek() != ")": raise ValueError("query: missing »)«")
+            self._tokens.pop(0)
+            return res
+        if tok in (")", "AND", "OR"): raise ValueError(f"query: unexpected »{tok}«")
+        if tok in self.flags: return self.flags[tok], None
+        field, _, value = tok.partition(":")
+        if field not in self.fields: field, value = None, tok
+        value = value.replace('"', "")
+        if not value: raise ValueError(f"query: value expected for »{tok}«")
+        rx = re.compile(value, re.IGNORECASE)
+        name = f"rx{len(self._regexes)}"
+        self._regexes[name] = rx.search
+        if field in ("repo", "group"): return f"{name}({self.fields[field]})", None
+        self._searched.append(value)
+        if field is None: return f"({name}(r.pkg) or {name}(r.desc))", TrigramIndex.literals(rx)
+        return f"{name}({self.fields[field]})", TrigramIndex.literals(rx)
+
+
 class Pkg:
     Row = namedtuple("Row", "db pkg ver grps ins old desc")
     Col = namedtuple("Col", "db pkg ver grps desc")
+    Layout = namedtuple("Layout", "rem descwidth splitver splitgrps grpswidth header pads colors dbcells")
     Installed = {}  # cache dict of `pkgname` => "version" (see info())
+    maxfetched = 64 # number of info/files results to cache (see _fetch())
+    maxviews = 3    # number of widths to keep formatted rows for (see lines())
+    trigrams = True # narrow down searches with a TrigramIndex (see _candidates())
+    prefetched = ("_get_info", "_get_packagefiles")  # needed by info() and filelist()
+    _indexes = {}   # cache-file name => (key, TrigramIndex or None while it's built), see _candidates()
+    _indexlock = threading.Lock()
 
     def __init__(self):
         # convenience
         self.env = dict(os.environ, LC_ALL="C")
         # will be populated by search()
         self.regex = None
+        self.query = None       # a Query, if self.queries is set
+        self.queries = False    # searchterms are queries, not regexes
+        self.fuzzy = False      # rank results by a fuzzy match, see Fuzzy
+        self.upgrades = False   # only list packages with a newer version available
         self.rows = None
-        # will be populated by getting self.cols (eg. in to_ascii())
-        self._cols = None
+        self._spancache = None, None, {}    # self._spans(), kept while self.regex is the same
+        # background jobs, see _fetch() and installed()
+        self._pool = None
+        self._prefetchpool = None
+        self._fetched = OrderedDict()
+        self._prefetching = {}  # key => Future of pending/running prefetches
+        self._fetchlock = threading.RLock()
+        self._installed = None
+
+
+    @property
+    def rows(self): return self._rows
+
+    @rows.setter
+    def rows(self, val):
+        self._rows = val
+        # these depend on rows and will be populated on demand
+        self._cols = None       # self.cols
+        self._layouts = {}      # self._layout(), per width
+        self._views = OrderedDict() # self.lines(), per width (the last maxviews)
+        self._byname = None     # self._version()
 
 
     @property
@@ -274,14 +1172,17 @@ class Pkg:
         return self._cols
 
 
+    @Timer("output")
     def to_json(self):
         """
         print a JSON-String with currently fetched rows.
         """
+        import json
         json.dump([r._asdict() for r in self.rows], sys.stdout, indent=2)
         print()
 
 
+    @Timer("output")
     def to_csv(self, sep="\t"):
         """
         print items in each row separated by tab (or other separator)
@@ -291,18 +1192,45 @@ class Pkg:
             print(sep.join(s if s else "" for s in r))
 
 
-    def _highlight(self, s):
+    def _spans(self, r):
         """
-        highlight search
+        highlighted parts of a row: (start, end) of all matches of self.regex
+        in name, groups and description (with whitespace collapsed, like
+        wrap() does). Adjacent matches are merged, so a search for "." gives
+        one span per field. Found once per row and regex, see _formatrow().
+        Returns (name-spans, groups-spans, description-spans, description).
         """
-        return self.regex.sub(hl("\\g<0>", Style.highlight), s)
-
-
-    def _formatize(self, width=80):
+        if self._spancache[0] is not self.regex:
+            try:    # finds a run of adjacent matches at once
+                runs = re.compile(f"(?:{self.regex.pattern})+", self.regex.flags)
+            except re.error:    # e.g. global flags like (?i)
+                runs = self.regex
+            self._spancache = self.regex, runs, {}
+        _, runs, cache = self._spancache
+        res = cache.get(r)
+        if res is None:
+            def find(s):
+                spans = []
+                for m in runs.finditer(s):
+                    a, b = m.span()
+                    if a == b: continue
+                    if spans and spans[-1][1] == a: spans[-1] = spans[-1][0], b
+                    else: spans.append((a, b))
+                return spans
+            desc = " ".join(r.desc.split())
+            res = cache[r] = find(r.pkg), find(r.grps) if r.grps else [], find(desc), desc
+        return res
+
+
+    def _layout(self, width=80):
         """
-        reformat rowlist to fit specified width, colorize etc.
+        Decide which columns to show and how wide they are for the specified
+        width. This only depends on self.cols, so it is done once per width,
+        along with everything else _formatrow() needs: header, blank cells
+        and color escapes of each column.
+        Raises an Exception if width is too small.
         """
-        if not self.rows: return []
+        if width in self._layouts: return self._layouts[width]
         descwidth = width - sum(self.cols[:4]) - 9
         rem = set()     # remove these columns
         if descwidth < Style.min_desc or self.cols.grps == 0:
@@ -333,61 +1261,126 @@ class Pkg:
         else:
             grpswidth = self.cols.grps
 
-        # insert header
-        ret = []
+        header = None
         if Style.header:
             header = []
-            def mkhead(w, l): return [f"{csi(Style.header)} {w[:l]:{l}} {csi()}"]
+            def mkhead(w, l): return f"{csi(Style.header)} {w[:l]:{l}} {csi()}"
             if "db" not in rem: header.append(mkhead('Repo', self.cols.db))
             if "grps" not in rem: header.append(mkhead('Group(s)', grpswidth))
             header.append(mkhead('Name', self.cols.pkg))
             if "ver" not in rem: header.append(mkhead('Version', self.cols.ver if splitver else self.cols.ver * 2 + 3))
-            header.append([mkhead('Description', descwidth-1)[0]])
-            ret = [header]
-
-        for n, r in enumerate(self.rows):
-            frow = []
-            desc = list(wrap(r.desc, descwidth))
-            grps = (r.grps.split() if splitgrps else [r.grps]) if r.grps else [""]
-            rol = max(
-                len(grps) if "grps" not in rem else 1,
-                2 if r.old and splitver and "ver" not in rem else 1,
-                len(desc)
-            )
+            header.append(mkhead('Description', descwidth-1))
+            header = "".join(header)
+
+        pads = dict(db=" " * (self.cols.db + 2), grps=" " * (grpswidth + 2),
+                    pkg=" " * (self.cols.pkg + 2), ver=" " * (self.cols.ver + 2))
+        colors = {k: escapes(fg, getattr(Style, k)) for k in ("grps", "pkg", "ver", "ins", "old", "desc")}
+        colors["hl"] = escapes(hl, Style.highlight)
+        lay = Pkg.Layout(rem, descwidth, splitver, splitgrps, grpswidth, header, pads, colors, {})
+        self._layouts[width] = lay
+        return lay
+
+
+    def _rowheight(self, r, lay):
+        """number of lines _formatrow() will return for a row, without formatting it"""
+        ndesc = 1 if len(r.desc) <= lay.descwidth else len(wrap(r.desc, lay.descwidth))
+        return max(
+            len(r.grps.split()) if r.grps and lay.splitgrps and "grps" not in lay.rem else 1,
+            2 if r.old and lay.splitver and "ver" not in lay.rem else 1,
+            ndesc
+        )
 
-            # add column entries with all the same length (number of columns may vary)
-            if "db" not in rem:
-                db = [fg(f" {r.db:{self.cols.db}} ", Style.db if r.db != Style.ext_str else Style.ext)]
-                frow.append(db + [" " * (self.cols.db + 2)] * (rol - 1))
-
-            if "grps" not in rem:
-                grs = [fg(self._highlight(f" {g:{grpswidth}} "), Style.grps) for g in grps]
-                frow.append(grs + [" " * (grpswidth + 2)] * (rol - len(grs)))
-
-            pkg = [fg(self._highlight(f" {r.pkg:{self.cols.pkg}} "), Style.ins if r.ins else Style.pkg)]
-            frow.append(pkg + [" " * (self.cols.pkg + 2)] * (rol - 1))
-
-            if "ver" not in rem:
-                ver = [fg(f" {r.ver:{self.cols.ver}} ", Style.ins if r.ins else Style.ver)]
-                ver += [" " * (self.cols.ver + 2)] * (rol - 1)
-                if r.old:
-                    if splitver:
-                        ver[1] = fg(f" {r.old:{self.cols.ver}} ", Style.old)
-                    else:
-                        ver[0] += "→" + fg(f" {r.old:{self.cols.ver}} ", Style.old)
-                else:
-                    if not splitver:
-                        ver[0] += f"  {'':{self.cols.ver}} "
-                frow.append(ver + [" " * (self.cols.ver + 2)] * (rol - len(ver)))
 
-            while len(desc) < rol: desc += [""]
-            des = [fg(self._highlight(f" {d:{descwidth}}"), Style.desc) for d in desc]
+    def _formatrow(self, r, lay):
+        """
+        format a single row with a layout from _layout().
+        returns a list of lines.
+        """
+        rem, descwidth, pads, colors = lay.rem, lay.descwidth, lay.pads, lay.colors
+        hlon, hloff = colors["hl"]
+        pspans, gspans, dspans, text = self._spans(r)
+        desc = wrap(text, descwidth) if len(text) > descwidth else [text]
+        grps = (r.grps.split() if lay.splitgrps else [r.grps]) if r.grps else [""]
+        rol = max(
+            len(grps) if "grps" not in rem else 1,
+            2 if r.old and lay.splitver and "ver" not in rem else 1,
+            len(desc)
+        )
 
-            frow.append(des)
-            ret.append(frow)
-        return ret
+        # add column entries with all the same length (number of columns may vary)
+        frow = []
+        if "db" not in rem:
+            db = lay.dbcells.get(r.db)  # there are only a few of them
+            if db is None:
+                db = lay.dbcells[r.db] = fg(f" {r.db:{self.cols.db}} ", Style.db if r.db != Style.ext_str else Style.ext)
+            frow.append([db] + [pads["db"]] * (rol - 1))
+
+        if "grps" not in rem:
+            on, off = colors["grps"]
+            w = lay.grpswidth
+            if gspans:
+                grs = [f"{on} {mark(g, sp, hlon, hloff)}{' ' * (w - len(g))} {off}"
+                       for g, sp in zip(grps, clip(r.grps, grps, gspans))]
+            else:
+                grs = [f"{on} {g:{w}} {off}" for g in grps]
+            frow.append(grs + [pads["grps"]] * (rol - len(grs)))
+
+        on, off = colors["ins" if r.ins else "pkg"]
+        w = self.cols.pkg
+        pkg = f"{on} {mark(r.pkg, pspans, hlon, hloff)}{' ' * (w - len(r.pkg))} {off}" if pspans else f"{on} {r.pkg:{w}} {off}"
+        frow.append([pkg] + [pads["pkg"]] * (rol - 1))
+
+        if "ver" not in rem:
+            on, off = colors["ins" if r.ins else "ver"]
+            w = self.cols.ver
+            ver = [f"{on} {r.ver:{w}} {off}"] + [pads["ver"]] * (rol - 1)
+            if r.old:
+                on, off = colors["old"]
+                if lay.splitver: ver[1] = f"{on} {r.old:{w}} {off}"
+                else: ver[0] += f"→{on} {r.old:{w}} {off}"
+            elif not lay.splitver:
+                ver[0] += " " * (w + 3)
+            frow.append(ver)
+
+        on, off = colors["desc"]
+        if dspans:
+            des = [f"{on} {mark(d, sp, hlon, hloff)}{' ' * (descwidth - len(d))}{off}"
+                   for d, sp in zip(desc, clip(text, desc, dspans))]
+        else:
+            des = [f"{on} {d:{descwidth}}{off}" for d in desc]
+        frow.append(des + [f"{on} {'':{descwidth}}{off}"] * (rol - len(des)))
+        if rol == 1: return ["".join(c[0] for c in frow)]
+        return ["".join(l) for l in zip(*frow)]
 
 
+    @Timer("_formatize")
+    def _formatize(self, width=80):
+        """
+        reformat rowlist to fit specified width, colorize etc.
+        returns a list of lines for the header (if any) and every row.
+        """
+        if not self.rows: return []
+        lay = self._layout(width)
+        ret = [[lay.header]] if lay.header else []
+        return ret + [self._formatrow(r, lay) for r in self.rows]
+
+
+    def lines(self, width=80):
+        """
+        lazily formatted rows for the interactive list (see FormattedRows).
+        one instance per width is kept for the last few widths, so resizing
+        back and forth is cheap.
+        """
+        if width in self._views:
+            self._views.move_to_end(width)
+        else:
+            prev = next(reversed(self._views.values()), None)
+            self._views[width] = FormattedRows(self, width, prev)
+            if len(self._views) > self.maxviews: self._views.popitem(last=False)
+        return self._views[width]
+
+
+    @Timer("output")
     def to_ansi(self, width=80):
         """
         display rows as a nice table with specified width.
@@ -395,9 +1388,9 @@ class Pkg:
         (in that order, until sufficient space for description is available)
         """
         try:
-            for n, r in enumerate(self._formatize(width)):
-                rowtxt = "\n".join(csi(Style.zebra[n % 2])+"".join(c[i] for c in r)+csi() for i in range(len(r[0])))
-                sys.stdout.write(rowtxt + "\n")
+            zebra, end = [csi(z) for z in Style.zebra], csi()
+            sys.stdout.writelines(f"{zebra[n % 2]}{l}{end}\n"
+                for n, r in enumerate(self._formatize(width)) for l in r)
         except Exception as e:
             sys.stderr.write(fg(e, 9)+"\n")
 
@@ -407,15 +1400,13 @@ class Pkg:
         same as above, but without the zebra-stripes and return a list
         instead of printing to stdout
         """
-        ret = []
         try:
-            for n, r in enumerate(self._formatize(width)):
-                ret.append(["".join(c[i] for c in r) for i in range(len(r[0]))])
+            return self._formatize(width)
         except Exception as e:
-            ret.append(["",fg(e, 9)])
-        return ret
+            return [["",fg(e, 9)]]
 
 
+    @Timer("filelist")
     def filelist(self, name, width=80, height=25):
         """
         Show filelist for package.
@@ -424,7 +1415,10 @@ class Pkg:
         """
         last = ""
         res = []
-        packagefiles = self._get_packagefiles(name, width, height)
+        try:
+            packagefiles = self._fetch("_get_packagefiles", name).result()
+        except Exception as e:
+            return columnize(errlines(e), width, height)
         if len(packagefiles) < 1: return ["Package contains no files"]
         for s in packagefiles:
             if s.endswith("/"): continue    # do not list plain directories
@@ -436,54 +1430,773 @@ class Pkg:
             res += ["  " + f]
         return columnize(res, width, height)
 
-    
+
+    def _executor(self, prefetch=False):
+        """
+        small thread pool for background jobs (created on demand). Prefetches
+        have one of their own, so they never hold up what's needed now.
+        """
+        import concurrent.futures
+        if prefetch:
+            if self._prefetchpool is None:
+                self._prefetchpool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+            return self._prefetchpool
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+        return self._pool
+
+
+    def _version(self, name):
+        """versions of a package in current rows, None if unknown"""
+        if self._byname is None:
+            self._byname = {r.pkg: (r.ver, r.old) for r in self.rows or []}
+        return self._byname.get(name)
+
+
+    def _candidates(self, name, key, rows):
+        """
+        rows of a table (cached in cache-file name, valid for key) which may
+        match self.regex (or self.query), see TrigramIndex. rows is a function
+        returning the texts for TrigramIndex.build(). If there is no index
+        yet, it's built in background. Returns None to search all rows (until
+        then).
+        """
+        if not self.trigrams: return None
+        alts = self.query.literals if self.query is not None else TrigramIndex.literals(self.regex)
+        if alts is None: return None
+        with self._indexlock:
+            index = self._indexes.get(name)
+            if index is None or index[0] != key:
+                index = key, TrigramIndex.load(name, key)
+                self._indexes[name] = index
+                # not a daemon: a single search (pms -c) finishes the cache-file before exiting
+                if index[1] is None: threading.Thread(target=self._build_index, args=(name, key, rows)).start()
+        return None if index[1] is None else index[1].candidates(alts)
+
+
+    def _build_index(self, name, key, rows):
+        """build the TrigramIndex for _candidates()"""
+        index = TrigramIndex.build(name, key, rows())
+        with self._indexlock:
+            if self._indexes.get(name, (None,))[0] == key: self._indexes[name] = key, index
+
+
+    def _compile(self, search):
+        """set self.regex (and self.query, if searchterms are queries) for a search"""
+        if self.queries:
+            self.query = Query(search, self.outdated)
+            self.regex = self.query.regex
+        elif self.fuzzy:
+            self.query, self.regex = None, Fuzzy.regex(search)
+        else:
+            self.query, self.regex = None, re.compile(search, re.IGNORECASE)
+
+
+    def _fetch(self, what, name, prefetch=False):
+        """
+        Future for self.<what>(name), e.g. _get_info or _get_packagefiles.
+        Results are kept in an LRU-cache keyed by name and version; missing
+        entries are submitted to the thread pool. A prefetch still waiting
+        for its turn is taken over if the result is needed now. Failed jobs
+        are not kept (see _done).
+        """
+        key = (what, name, self._version(name))
+        with self._fetchlock:
+            fut = self._fetched.get(key)
+            if fut is not None and not prefetch and self._prefetching.get(key) is fut and fut.cancel():
+                fut = None
+            if fut is None:
+                fut = self._executor(prefetch).submit(getattr(self, what), name)
+                self._fetched[key] = fut
+                if prefetch: self._prefetching[key] = fut
+                fut.add_done_callback(lambda f: self._done(key, f))
+                if len(self._fetched) > self.maxfetched:
+                    old, oldfut = self._fetched.popitem(last=False)
+                    if self._prefetching.get(old) is oldfut: oldfut.cancel()
+            else:
+                self._fetched.move_to_end(key)
+        return fut
+
+
+    def _done(self, key, fut):
+        """a job of _fetch() is done (or cancelled): drop it unless it succeeded"""
+        with self._fetchlock:
+            if self._prefetching.get(key) is fut: del self._prefetching[key]
+            if (fut.cancelled() or fut.exception() is not None) and self._fetched.get(key) is fut:
+                del self._fetched[key]
+
+
+    def prefetch(self, names):
+        """
+        speculatively fetch everything needed for info() and filelist().
+        Pending prefetches of other packages are cancelled, they are not
+        needed anymore (e.g. the cursor has moved on).
+        """
+        names = list(names)
+        with self._fetchlock:
+            for key, fut in list(self._prefetching.items()):
+                if key[1] not in names: fut.cancel()
+            for name in names:
+                for what in self.prefetched: self._fetch(what, name, prefetch=True)
+
+
+    def installed(self):
+        """
+        Future for _get_installed(). It is run only once, in background,
+        every caller waits for the same result. It has a thread of its own,
+        so jobs in the pool may wait for it as well.
+        """
+        import concurrent.futures
+        with self._fetchlock:
+            if self._installed is None:
+                single = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+                self._installed = single.submit(self._get_installed)
+                single.shutdown(wait=False)
+        return self._installed
+
+
+    def _depstates(self, deps, cmp):
+        """
+        check dependencies like "name>=1.0" against self.Installed, all in
+        one pass. cmp compares two versions (vercmp or debvercmp).
+        Returns a list of (text, color): Style.ins if satisfied, Style.unsat
+        if installed but the version doesn't fit (text keeps the constraint)
+        and Style.pkg if not installed at all.
+        """
+        ok = {"<": lambda c: c < 0, "<<": lambda c: c < 0, "<=": lambda c: c <= 0,
+              "=": lambda c: c == 0, "!=": lambda c: c != 0,
+              ">=": lambda c: c >= 0, ">": lambda c: c > 0, ">>": lambda c: c > 0}
+        res = []
+        for name, op, ver in (re.match(r"([^<=>!]*)([<=>!]*)(.*)", d).groups() for d in deps):
+            if name not in self.Installed: res.append((name, Style.pkg))
+            elif not op: res.append((name, Style.ins))
+            else:
+                have = self.Installed[name]
+                # unversioned provides don't satisfy a versioned dependency
+                good = have is not None and ok.get(op, bool)(cmp(have, ver))
+                res.append((name, Style.ins) if good else (f"{name}{op}{ver}", Style.unsat))
+        return res
+
+
+    def shutdown(self):
+        """drop pending background jobs"""
+        for pool in (self._pool, self._prefetchpool):
+            if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._prefetchpool = None
+
+
+    def search(self, search="."):
+        """
+        Perform a search in local and remote databases.
+        The results are stored in self.rows. Use to_*() functions to retrieve.
+        """
+        with Timer("search"): rows = self._search(search)
+        with Timer("sort"): self.rows = sorted(rows, key=lambda x: x.pkg)
+        if self.fuzzy:
+            with Timer("rank"): self.rows = Fuzzy(self.rows).rank(search)
+
+
+    def _search(self, search):
+        """
+        all rows stream(search) yields, at once. Backends override this if
+        they can do without an event loop (asyncio takes a while to import).
+        """
+        import asyncio
+        async def collect():
+            return [r async for batch in self.stream(search) for r in batch]
+        return asyncio.run(collect())
+
+
     # Implement these:
     def _get_installed(self): pass
-    def search(self, search="."): pass
-    def _get_packagefiles(self, name, width=80, height=25): pass
+    async def stream(self, search="."): yield []    # batches of rows, see search()
+    def _get_packagefiles(self, name): pass
+    def _get_info(self, name): pass
+    def owns(self, pattern): pass
     def info(self, name, width=80, height=25): pass
     def updateDB(self): pass
+    @staticmethod
+    def outdated(row): return bool(row.old)     # newer version available, like upgrades
+    def dbfiles(self): return []    # databases (files, directories), see Daemon
+    def forget(self): pass          # drop what was read from them
+
+
+class FormattedRows:
+    """
+    Rows of a Pkg formatted for a given width, like Pkg.to_list() without
+    the header. Rows are only formatted when accessed (i.e. displayed) and
+    kept in a bounded cache. Row heights are known upfront and indexed
+    (Fenwick tree), so mapping rows to lines and vice versa is cheap.
+    If the rows of another width are given, only heights of rewrapped rows
+    are updated in the index.
+    """
+    maxcache = 1000     # number of formatted rows to keep
+
+    def __init__(self, pkg, width, prev=None):
+        self.pkg = pkg
+        self.cache = OrderedDict()
+        try:
+            if not pkg.rows: raise ValueError("")   # nothing (found yet)
+            self.layout = pkg._layout(width)
+            self.header = self.layout.header or ""
+            self.heights = [pkg._rowheight(r, self.layout) for r in pkg.rows]
+        except Exception as e:
+            self.layout, self.header, self.heights = None, fg(e, 9), []
+
+        if prev is not None and len(prev) == len(self):
+            self.index = prev.index.copy()
+            for i, (h, o) in enumerate(zip(self.heights, prev.heights)):
+                if h != o: self.index.update(i, h)
+        else:
+            self.index = Fenwick(self.heights)
+
+
+    def __len__(self): return len(self.heights)
+
+
+    def __getitem__(self, i):
+        if i < 0: i += len(self)
+        if i in self.cache:
+            self.cache.move_to_end(i)
+            return self.cache[i]
+        if not 0 <= i < len(self): raise IndexError(i)
+        lines = self.pkg._formatrow(self.pkg.rows[i], self.layout)
+        self.cache[i] = lines
+        if len(self.cache) > self.maxcache: self.cache.popitem(last=False)
+        return lines
+
+
+def ones(mask):
+    """indices of the bits set in an integer"""
+    s = bin(mask)[:1:-1]    # lowest bit first
+    i = s.find("1")
+    while i >= 0:
+        yield i
+        i = s.find("1", i + 1)
+
+
+class RowFilter:
+    """
+    Narrow down rows to those containing all words of a query in name,
+    description or groups (case-insensitive). For each character a bitset
+    of the rows containing it is built on first use, so most rows are
+    ruled out without looking at them. Results of the previous queries are
+    kept: typing narrows down the last result, deleting returns to it.
+    texts: lowercase texts to use instead of name, description and groups.
+    """
+    def __init__(self, rows, texts=None):
+        self.texts = texts or [f"{r.pkg}\t{r.desc}\t{r.grps or ''}".lower() for r in rows]
+        self.charbits = {}
+        self.results = [("", (1 << len(self.texts)) - 1)]   # (query, bitset)
+
+
+    @staticmethod
+    def _bits(texts, c):
+        """bitset of texts containing character c"""
+        import operator
+        from itertools import repeat
+        found = bytes(map(operator.contains, reversed(texts), repeat(c)))   # lowest bit last
+        return int(b"0" + found.translate(b"01".ljust(256)), 2)
+
+
+    def bits(self, c):
+        """bitset of rows containing character c"""
+        if c not in self.charbits: self.charbits[c] = self._bits(self.texts, c)
+        return self.charbits[c]
+
+
+    def add(self, texts):
+        """more rows (their lowercase texts), the bitsets are extended"""
+        n = len(self.texts)
+        self.texts += texts
+        for c in self.charbits: self.charbits[c] |= self._bits(texts, c) << n
+        self.results = [("", (1 << len(self.texts)) - 1)]
+
+
+    def match(self, query):
+        """indices of rows matching query"""
+        query = query.lower()
+        while not query.startswith(self.results[-1][0]): self.results.pop()
+        if query != self.results[-1][0]:
+            mask, words = self.results[-1][1], query.split()
+            for c in set(query) - {" "}: mask &= self.bits(c)
+            found = bytearray(b"0" * (len(self.texts) + 1))
+            for i in ones(mask):
+                if all(w in self.texts[i] for w in words): found[-1 - i] = 49  # "1"
+            self.results.append((query, int(found, 2)))
+        return list(ones(self.results[-1][1]))
+
+
+class Fuzzy:
+    """
+    Rank rows like fzf: the characters of a query have to appear in this
+    order in the name or description (case-insensitive). Matches in the
+    name always rank higher. Each matched character scores, more so at
+    the start of a word or right after the previous one, gaps cost.
+    Candidates are the rows containing all characters of the query (see
+    RowFilter.bits), shortest name first: once there are limit rows with the
+    best possible score, the rest is skipped. Descriptions are only searched if there are less than limit
+    names. Rows can be added (e.g. while a search finds them), what was
+    computed for the others is kept.
+    """
+    limit = 100             # number of rows rank() returns
+    boundary = "\n -_./+:@" # a word starts after these
+
+    def __init__(self, rows=()):
+        self.rows = []
+        self._filters = [None, None]
+        self._keys = []         # (length of name, name) of each row
+        self._order = None
+        self.add(rows)
+
+
+    def add(self, rows):
+        """rank these rows too"""
+        rows = list(rows)
+        n = len(self.rows)
+        self.rows += rows
+        self._keys += [(len(r.pkg), r.pkg) for r in rows]
+        for tier, rf in enumerate(self._filters):
+            if rf is not None: rf.add(self._texts(tier, rows))
+        if self._order is not None:
+            self._order = sorted(self._order + list(range(n, len(self.rows))), key=self._keys.__getitem__)
+
+
+    @staticmethod
+    def _texts(tier, rows):
+        return list(map(str.lower, [r.desc for r in rows] if tier else [r.pkg for r in rows]))
+
+
+    def filter(self, tier):
+        """RowFilter of all names (tier 0) or descriptions (1), in lowercase"""
+        if self._filters[tier] is None:
+            self._filters[tier] = RowFilter(self.rows, self._texts(tier, self.rows))
+        return self._filters[tier]
+
+
+    def order(self):
+        """indices of rows, shortest name first (then by name)"""
+        if self._order is None:
+            self._order = sorted(range(len(self.rows)), key=self._keys.__getitem__)
+        return self._order
+
+
+    @staticmethod
+    def regex(query, groups=False, sep=""):
+        """
+        regex finding the characters of query in order (as early as
+        possible), e.g. `a[^b]*b[^c]*c`. Also fine for `pacman -Ss`.
+        groups: capture each character, for positions. sep: characters
+        which must not be in between.
+        """
+        chars = [c for c in query.lower() if not c.isspace()]
+        rx = ""
+        for i, c in enumerate(chars):
+            if i: rx += f"[^{sep}" + ("\\" + c if c in "\\]^[" else c) + "]*"
+            rx += f"({re.escape(c)})" if groups else re.escape(c)
+        return re.compile(rx, re.IGNORECASE)
+
+
+    @classmethod
+    def score(cls, text, positions):
+        """score of query-characters found at positions of text"""
+        score, prev, boundary = 0, -2, cls.boundary
+        for j, p in enumerate(positions):
+            bonus = 8 if p == 0 or text[p - 1] in boundary else 0
+            if j == 0: score += 16 + 2 * bonus
+            elif p == prev + 1: score += 16 + max(bonus, 4)     # consecutive
+            else: score += 16 + bonus - 3 - (p - prev - 2)      # gap
+            prev = p
+        return score
+
+
+    def rank(self, query, limit=None):
+        """the best rows for query (at most limit), best first"""
+        import heapq
+        limit = limit or self.limit
+        q = "".join(query.lower().split())
+        # texts are lowercase already, IGNORECASE would be slow
+        match = re.compile(self.regex(q, groups=True).pattern).match
+        score, boundary = self.score, self.boundary
+        # a contiguous match is better, usually. It scores the same as q
+        # itself, but for the bonus at its start.
+        contiguous = score(q, range(len(q))) - 16
+        # no row scores more: each character after the first at best directly
+        # follows one after which a word starts, or a gap of one character
+        best = 32 + sum(24 if c in boundary else 21 for c in q[:-1])
+        scored, names = [], set()
+        for tier in (0, 1):
+            rf = self.filter(tier)
+            mask = (1 << len(rf.texts)) - 1
+            for c in set(q): mask &= rf.bits(c)
+            candidate, nbest = bin(mask)[:1:-1].ljust(len(rf.texts), "0"), 0
+            for k, i in enumerate(self.order()):
+                if candidate[i] == "0" or i in names: continue
+                t = rf.texts[i]
+                pos = t.find(q)
+                if pos >= 0:
+                    s = contiguous + (16 if pos == 0 or t[pos - 1] in boundary else 0)
+                else:   # if there is a match, there's one at the first character
+                    m = match(t, t.find(q[0]))
+                    if m is None: continue
+                    s = score(t, [start for start, _ in m.regs[1:]])
+                scored.append((-tier, s, -k, i))    # ties: shorter name, then by name
+                if s == best:
+                    nbest += 1
+                    if nbest == limit: break    # later rows rank lower anyway
+            if len(scored) >= limit: break     # names rank higher anyway
+            names = {s[3] for s in scored}
+        return [self.rows[s[3]] for s in heapq.nlargest(limit, scored)]
+
+
+class Loader:
+    """
+    Run pkg.stream(search) in background, with an event loop of its own.
+    The rows arrive in batches, take() returns what's there so far.
+    cancel() stops the search (running programs are killed).
+    """
+    def __init__(self, pkg, search):
+        import queue
+        self.queue = queue.SimpleQueue()
+        self.done = False
+        self.error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(pkg, search), daemon=True)
+        self._thread.start()
+
+
+    def _run(self, pkg, search):
+        import asyncio
+        async def load():
+            self._loop, self._task = asyncio.get_running_loop(), asyncio.current_task()
+            self._ready.set()
+            async for rows in pkg.stream(search): self.queue.put(rows)
+        try:
+            with Timer("search"): asyncio.run(load())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._ready.set()
+
+
+    def take(self):
+        """all rows received since the last call"""
+        rows = []
+        while not self.queue.empty(): rows += self.queue.get()
+        return rows
+
+
+    def cancel(self):
+        self._ready.wait()
+        try:
+            if not self.done: self._loop.call_soon_threadsafe(self._task.cancel)
+        except RuntimeError:    # loop has just finished
+            pass
+
 
 
 #┌─────────────────────────────────────────────────────────────────────────────┐
 #│                      Custom Formats for Apt and Pacman                      │
 #└─────────────────────────────────────────────────────────────────────────────┘
 class AptPkg(Pkg):
-    def __init__(self):
-        super().__init__()
-        import apt
-        apt.apt_pkg.init()
+    Snap = namedtuple("Snap", "name comp sect inst cand summ")
+    SnapTable = None    # cache for _read_snapshot()
+    SnapKey = None      # its cache-key
+    _snaplock = threading.Lock()
+    FileTable = None    # cache for _read_contents()
+    _fileslock = threading.Lock()
+    Cache = None        # apt.Cache, see _cache()
+    _cachelock = threading.Lock()
+    RequiredBy = {}     # `pkgname` => set of installed packages depending on it
+    Provides = {}       # `pkgname` => names provided by installed package
+    lists = "/var/lib/apt/lists"
+    status = "/var/lib/dpkg/status"
+
+    def _cache(self):
+        """
+        The full apt.Cache (without i386-packages) is slow to build and only
+        needed for info(). It's created on first use.
+        """
+        with AptPkg._cachelock:
+            if AptPkg.Cache is None:
+                import apt
+                apt.apt_pkg.init()
+                class NotI386Filter(apt.cache.Filter):
+                    def apply(self, pkg):
+                        return not pkg.name.endswith(":i386")
+                cache = apt.cache.FilteredCache(apt.Cache())
+                cache.set_filter(NotI386Filter())
+                AptPkg.Cache = cache
+            return AptPkg.Cache
+
+
+    def _read_status(self):
+        """
+        installed packages from dpkg's status-file:
+        `pkgname` => dict of Version, Section, Description, Depends, Provides...
+        """
+        with open(self.status, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        fields = ("Package", "Status", "Architecture", "Version", "Section",
+                  "Description", "Depends", "Pre-Depends", "Provides")
+        return {d["Package"]: d for d in debcontrol(text, fields)
+                if d.get("Status", "").endswith(" installed") and d.get("Architecture") != "i386"}
+
 
-        #AptPkg.Cache = apt.Cache()
-        class NotI386Filter(apt.cache.Filter):
-            def apply(self, pkg):
-                return not pkg.name.endswith(":i386")
-        AptPkg.Cache = apt.cache.FilteredCache(apt.Cache())
-        AptPkg.Cache.set_filter(NotI386Filter())
+    def _packagelists(self):
+        """(component, path) of all Packages-files, except those for i386"""
+        res = []
+        for f in sorted(os.listdir(self.lists)):
+            base = re.sub(r"\.(lz4|gz|xz|bz2|zst)$", "", f)
+            if not base.endswith("_Packages") or "_binary-i386_" in base: continue
+            # e.g. deb.debian.org_debian_dists_bookworm_main_binary-amd64_Packages
+            m = re.search(r"_dists_[^_]+_(.+)_binary-[^_]+_Packages$", base)
+            res.append((m.group(1).replace("_", "/") if m else "", os.path.join(self.lists, f)))
+        return res
 
 
+    def _read_snapshot(self):
+        """
+        Read all Packages-files and dpkg's status into a column-oriented table
+        (AptPkg.Snap) with installed and candidate version of every package.
+        Like PacPkg._read_sync(), it's kept in AptPkg.SnapTable and in a
+        cache-file, which is valid as long as no list has changed. The
+        candidate is the highest version available (pinning is ignored), or
+        the installed one if that is newer: apt doesn't downgrade either.
+        Returns None if the lists can't be read.
+        """
+        with AptPkg._snaplock:
+            if AptPkg.SnapTable is not None: return AptPkg.SnapTable
+            try:
+                lists = self._packagelists()
+                # + version of the table (2: installed versions can be candidates)
+                key = filekey([p for _, p in lists] + [self.status]) + [2]
+            except OSError:
+                return None
+
+            cached = cache_read("apt", key)
+            if cached:
+                AptPkg.SnapTable = table_load(AptPkg.Snap, cached[1], cached[0]["n"])
+                AptPkg.SnapKey = key
+                return AptPkg.SnapTable
+
+            best = {}   # `pkgname` => (comp, section, version, summary)
+            try:
+                status = self._read_status()
+                for comp, path in lists:
+                    with open(path, "rb") as f:
+                        text = decompress(f.read()).decode("utf-8", "replace")
+                    for d in debcontrol(text, ("Package", "Version", "Section", "Description")):
+                        name, ver = d["Package"], d["Version"]
+                        if name in best and debverkey(best[name][2]) >= debverkey(ver): continue
+                        best[name] = (comp, d.get("Section", ""), ver, d.get("Description", ""))
+            except (OSError, KeyError, subprocess.CalledProcessError):
+                return None
+            # installed, but not available (anymore) or only in an older
+            # version (e.g. built locally): it's its own candidate, like in apt
+            for name, d in status.items():
+                if name not in best or debverkey(d["Version"]) > debverkey(best[name][2]):
+                    best[name] = ("now", d.get("Section", ""), d["Version"], d.get("Description", ""))
+
+            table = AptPkg.Snap([], [], [], [], [], [])
+            for name in sorted(best):
+                comp, sect, cand, summ = best[name]
+                table.name.append(name)
+                table.comp.append(comp)
+                table.sect.append(sect)
+                table.inst.append(status[name]["Version"] if name in status else "")
+                table.cand.append(cand)
+                table.summ.append(summ)
+            cache_write("apt", key, table_dump(table), n=len(table.name))
+            AptPkg.SnapTable, AptPkg.SnapKey = table, key
+            return table
+
+
+    def _contentsfiles(self):
+        """Contents-files [(component, path)], dpkg's info-directory and their cache-key"""
+        infodir = os.path.join(os.path.dirname(self.status), "info")
+        contents = []
+        for f in sorted(os.listdir(self.lists)):
+            # e.g. deb.debian.org_debian_dists_bookworm_main_Contents-amd64.lz4
+            m = re.search(r"_dists_[^_]+_(.+)_Contents-(?!udeb)([^_.]+)(\.\w+)?$", f)
+            if m and m.group(2) != "i386":
+                contents.append((m.group(1).replace("_", "/"), os.path.join(self.lists, f)))
+        # directory mtime changes on every (un)install and upgrade
+        return contents, infodir, filekey([p for _, p in contents] + [infodir])
+
+
+    @staticmethod
+    def _dpkglist(path):
+        """paths in one of dpkg's file lists (info/<name>.list)"""
+        with open(path, encoding="utf-8", errors="replace") as lst:
+            return [x for x in lst.read().splitlines() if x and x != "/."]
+
+
+    def _read_contents(self, wait=True):
+        """
+        Build a FileIndex from the Contents-files in the lists (as fetched
+        for apt-file) and dpkg's file lists of installed packages (repo
+        "local"). Like PacPkg._read_files(), it's kept in AptPkg.FileTable
+        and a cache-file which is rebuilt when the lists change. Unless wait
+        is set, only a valid cache-file is used (it's just mapped), otherwise
+        the index is built in background and None is returned until it's
+        ready.
+        """
+        if not wait:
+            if AptPkg.FileTable is None and not AptPkg._fileslock.locked():
+                try: index = FileIndex.load("contents", self._contentsfiles()[2])
+                except OSError: index = None
+                if index is not None: AptPkg.FileTable = index
+                else: threading.Thread(target=self._read_contents, daemon=True).start()
+            return AptPkg.FileTable
+        with AptPkg._fileslock:
+            if AptPkg.FileTable is not None: return AptPkg.FileTable
+            try: contents, infodir, key = self._contentsfiles()
+            except OSError: return None
+
+            index = FileIndex.load("contents", key)
+            if index is not None:
+                AptPkg.FileTable = index
+                return index
+
+            def entries():
+                for f in os.listdir(infodir):
+                    if not f.endswith(".list") or f.endswith(":i386.list"): continue
+                    yield "local", f[:-5].split(":")[0], self._dpkglist(os.path.join(infodir, f))
+                for comp, path in contents:
+                    with open(path, "rb") as f: data = decompress(f.read())
+                    packages = {}   # Contents is sorted by path, we need it by package
+                    for line in data.splitlines():
+                        try: path, pkgs = line.rsplit(None, 1)
+                        except ValueError: continue
+                        if path == b"FILE": continue    # old header
+                        path = "/" + path.decode("utf-8", "replace")
+                        for pkg in pkgs.decode().split(","):
+                            packages.setdefault(pkg.rsplit("/", 1)[-1], []).append(path)
+                    del data
+                    for name in sorted(packages): yield comp, name, packages[name]
+
+            try:
+                AptPkg.FileTable = FileIndex.build("contents", key, entries())
+            except (OSError, ValueError, subprocess.CalledProcessError):
+                return None
+            return AptPkg.FileTable
+
+
+    @Timer("_get_installed")
     def _get_installed(self):
-        # Cache This!
+        """
+        Installed versions and (in the same pass) reverse dependencies and
+        provides of all installed packages. Run in background by installed().
+        """
         if self.Installed: return
-        self.Installed = {}
-        for pkg in self.Cache:
+        try:
+            status = self._read_status()
+        except OSError:
+            self._get_installed_cache()
+            return
+        def names(field):   # "a (>= 1), b:any | c" => a, b
+            return [x.split("|")[0].split("(")[0].split(":")[0].strip()
+                    for x in field.split(",") if x.strip()]
+        installed, required, provides = {}, {}, {}
+        for name, d in status.items():
+            installed[name] = d["Version"]
+            for dep in names(d.get("Pre-Depends", "")) + names(d.get("Depends", "")):
+                required.setdefault(dep, set()).add(name)
+            if d.get("Provides"):
+                provides[name] = names(d["Provides"])
+        for name, prov in provides.items():
+            for p in prov: installed.setdefault(p, installed[name])
+        self.RequiredBy, self.Provides = required, provides
+        self.Installed = installed
+
+
+    def _get_installed_cache(self):
+        """same as _get_installed(), but use apt.Cache"""
+        installed, required, provides = {}, {}, {}
+        for pkg in self._cache():
             if not pkg.installed: continue
-            self.Installed[pkg.name] = pkg.installed.version
-            # TODO: also add "provides" to this
-            for prov in pkg.installed.provides:
-                self.Installed[prov] = pkg.installed.version
+            installed[pkg.name] = pkg.installed.version
+            for dep in pkg.installed.dependencies:
+                required.setdefault(dep[0].name, set()).add(pkg.name)
+            if pkg.installed.provides:
+                provides[pkg.name] = pkg.installed.provides
+        for name, prov in provides.items():
+            for p in prov: installed.setdefault(p, installed[name])
+        self.RequiredBy, self.Provides = required, provides
+        self.Installed = installed
 
 
-    def search(self, search="."):
-        """
-        Perform a search in local and remot databases.
-        The results are stored in self.rows. Use to_*() functions to retrieve.
-        """
-        self.regex = re.compile(search, re.IGNORECASE)
-        self._cols = None
+    async def stream(self, search="."):
+        """all rows at once, reading the snapshot is fast enough"""
+        import asyncio
+        yield await asyncio.to_thread(self._search, search)
 
 
-        self.rows = [Pkg.Row(
+    def _search(self, search):
+        self._compile(search)
+        return self._search_outdated() if self.upgrades else self._search_snapshot()
+
+
+    def _search_snapshot(self, names=None):
+        """
+        rows for search() from the snapshot-table. If names is given, the
+        packages with these names are listed instead.
+        """
+        table = self._read_snapshot()
+        if table is None: return self._search_cache(names)
+        rx = self.regex.search
+        if names is not None: rx = lambda s: s.split("\t", 1)[0] in names
+        elif self.query is not None: rx = lambda s: True     # see below
+        found = None if names is not None else self._candidates("apt.tri", AptPkg.SnapKey,
+            lambda: ((name + "\t" + summ, sect) for name, sect, summ in zip(table.name, table.sect, table.summ)))
+        rows = [Pkg.Row(
+                table.comp[i],
+                table.name[i],
+                table.inst[i] or table.cand[i],
+                table.sect[i] or None,
+                "installed" if table.inst[i] else None,
+                table.cand[i] if table.inst[i] and table.cand[i] != table.inst[i] else None,
+                table.summ[i]
+            ) for i in (range(len(table.name)) if found is None else found)
+            if rx(table.name[i] + "\t" + table.summ[i])]
+        if names is None and self.query is not None: rows = list(filter(self.query.match, rows))
+        return rows
+
+
+    def _search_outdated(self):
+        """
+        installed packages with a newer candidate, matching the searchterm.
+        The snapshot-table already has both versions side by side.
+        """
+        table = self._read_snapshot()
+        if table is None:
+            return [r for r in self._search_cache() if self.outdated(r)]
+        rx = self.regex.search if self.query is None else lambda s: True
+        rows = [Pkg.Row(table.comp[i], table.name[i], table.inst[i], table.sect[i] or None,
+                "installed", table.cand[i], table.summ[i])
+            for i, (inst, cand) in enumerate(zip(table.inst, table.cand))
+            if inst and cand != inst and debvercmp(cand, inst) > 0
+            and rx(table.name[i] + "\t" + table.summ[i])]
+        if self.query is not None: rows = list(filter(self.query.match, rows))
+        return rows
+
+
+    @staticmethod
+    def outdated(row):
+        """row has a newer candidate (row.old), like apt would upgrade it"""
+        return bool(row.old) and debvercmp(row.old, row.ver) > 0
+
+
+    def _search_cache(self, names=None):
+        """same as _search_snapshot(), but use apt.Cache"""
+        rx = self.regex.search
+        if names is not None: rx = lambda s: s.split("\t", 1)[0] in names
+        elif self.query is not None: rx = lambda s: True
+        rows = [Pkg.Row(
             pkg.candidate.origins[0].component,
             pkg.name,
             pkg.installed.version if pkg.installed else pkg.candidate.version,
@@ -491,32 +2204,73 @@ class AptPkg(Pkg):
             "installed" if pkg.installed else None,
             pkg.candidate.version if pkg.installed and pkg.candidate.version != pkg.installed.version else None,
             pkg.candidate.summary
-        ) for pkg in self.Cache if pkg.candidate is not None and self.regex.search(pkg.name + "\t" + pkg.candidate.summary)]
-        self.rows.sort(key=lambda x: x.pkg)
-
-
-    def _get_packagefiles(self, name, width=80, height=25):
-        try:
-            return [s.split(": ", maxsplit=2)[1] for s in cmd("apt-file", ["list", name])]
-        except Exception as e:
-            return str(e).splitlines()
+        ) for pkg in self._cache() if pkg.candidate is not None and rx(pkg.name + "\t" + pkg.candidate.summary)]
+        if names is None and self.query is not None: rows = list(filter(self.query.match, rows))
+        return rows
 
 
+    def owns(self, pattern):
+        """
+        Find packages owning files matching pattern, see PacPkg.owns().
+        Installed packages are checked as well as the Contents-files.
+        """
+        index = self._read_contents()
+        if index is not None:
+            names = {n for _, n, _ in index.owners(pattern)}
+        else:   # installed packages only
+            try:
+                names = {n.split(":")[0] for l in cmd("dpkg", ["-S", pattern])
+                         for n in l.split(": ", 1)[0].split(", ")}
+            except subprocess.CalledProcessError:
+                names = set()
+        alt = "|".join(map(re.escape, sorted(names, key=len, reverse=True)))
+        self.regex = re.compile(rf"(?<![\w@.+-])(?:{alt})(?![\w@.+-])" if names else "(?!)")
+        self.rows = sorted(self._search_snapshot(names), key=lambda x: x.pkg)
+
+
+    def _get_packagefiles(self, name):
+        index = self._read_contents(wait=False)    # don't wait for a rebuild
+        files = index.files(name) if index is not None else None
+        if files is not None: return files
+        # installed: dpkg knows, apt-file isn't needed (and may be missing)
+        import glob
+        infodir = os.path.join(os.path.dirname(self.status), "info")
+        lists = [os.path.join(infodir, name + ".list")]
+        lists += sorted(glob.glob(os.path.join(infodir, glob.escape(name) + ":*.list")))  # multiarch
+        for path in lists:
+            try: return self._dpkglist(path)
+            except OSError: pass
+        return [s.split(": ", maxsplit=2)[1] for s in cmd("apt-file", ["list", name])]
+
+
+    def _get_info(self, name):
+        """installed packages depending on this one (or on something it provides)"""
+        self._cache()   # info() needs it, build it in background if prefetched
+        self.installed().result()
+        required = set(self.RequiredBy.get(name, ()))
+        for prov in self.Provides.get(name, ()):
+            required.update(self.RequiredBy.get(prov, ()))
+        required.discard(name)
+        return sorted(required)
+
+
+    @Timer("info")
     def info(self, name, width=80, height=25):
         """
         show fancy package-info.
         Highlight installed packages.
         """
         if width < 40: return ["Width too small"]
-        if name not in self.Cache: return [f"No such package »{name}«"]
+        cache = self._cache()
+        if name not in cache: return [f"No such package »{name}«"]
 
         # ignore this (partly used in header):
         #hfields = ("Repository", "Name", "Version", "Description", "Groups", "Licenses")
         # Dies sind Paketlisten und werden anders formatiert:
         plists = ("Depends On", "Required By", "Optional For", "Replaces", "Conflicts With")
 
-        if not self.Installed: self._get_installed()
-        p = self.Cache[name].candidate
+        self.installed().result()
+        p = cache[name].candidate
 
         CW = 17  # number of chars for left column
 
@@ -524,22 +2278,17 @@ class AptPkg(Pkg):
                  fg(p.origins[0].component, Style.grps) + "  /  " +\
                  fg(p.section, Style.grps)
 
-        def pkgcol(what):
-            if type(what) is str:    # for provides
-                nom = what
-            else:
-                nom = what[0].name  # for dependency & recommends.
+        def pkgcol(nom):    # for provides & required
             return fg(nom, Style.ins if nom in self.Installed else Style.pkg)
 
-        required = set() # reverse deps are a bit costly: we have to iterate!
-        for othr in self.Cache:
-            if not othr.installed: continue
-            if name in (d[0].name for d in othr.installed.dependencies):
-                required.add(othr.name)
+        def depstr(dep):    # first alternative of dependency & recommends, "name>=version"
+            return dep[0].name + (dep[0].relation + dep[0].version if dep[0].relation else "")
+
+        required = self._fetch("_get_info", name).result()
 
         provides    = columnize([pkgcol(dep) for dep in p.provides], width - CW)
-        depends     = columnize([pkgcol(dep) for dep in p.dependencies], width - CW)
-        recommends  = columnize([pkgcol(dep) for dep in p.recommends], width - CW)
+        depends     = columnize(self._depstates([depstr(d) for d in p.dependencies], debvercmp), width - CW)
+        recommends  = columnize(self._depstates([depstr(d) for d in p.recommends], debvercmp), width - CW)
         required    = columnize([pkgcol(dep) for dep in required], width - CW)
 
         def addif(title, stuff):
@@ -567,7 +2316,7 @@ class AptPkg(Pkg):
         BR = " "*width
 
         result = [
-            fg(name, Style.ins if self.Cache[name].installed else Style.pkg) + " " +
+            fg(name, Style.ins if cache[name].installed else Style.pkg) + " " +
             fg(p.version, Style.ver) + " " * (width - len(name + p.version) - 1),
             BR,
             origin + " " * (width - alen(origin)),
@@ -584,6 +2333,22 @@ class AptPkg(Pkg):
 
     def updateDB(self):
         sudocmd("apt", ["update"])
+        # everything read from the lists is outdated now
+        AptPkg.SnapTable = AptPkg.Cache = AptPkg.FileTable = None
+        threading.Thread(target=self._read_snapshot, daemon=True).start()
+        self._read_contents(wait=False)
+        self.Installed = {}
+        with self._fetchlock:
+            self._installed = None
+            self._fetched.clear()
+        self.installed()
+
+
+    def dbfiles(self): return [self.lists, self.status]
+
+
+    def forget(self):
+        AptPkg.SnapTable = AptPkg.SnapKey = AptPkg.FileTable = AptPkg.Cache = None
 
 
     def install(self, pkglist): sudocmd("apt", ["install"] + pkglist)
@@ -593,8 +2358,37 @@ class AptPkg(Pkg):
 
 
 class PacPkg(Pkg):
+    Sync = namedtuple("Sync", "repo name ver grps desc prov")
+    SyncTable = None        # cache for _read_sync()
+    SyncKey = None          # its cache-key
+    _synclock = threading.Lock()
+    FileTable = None        # cache for _read_files()
+    _fileslock = threading.Lock()
+    LocalVersions = None, {} # cache for _local_versions(): (key, result)
+    ForeignTable = None, None # cache for _search_foreign(): (key, table)
+    dbpath = None           # None: use DBPath from pacman.conf
+    repos = None            # configured repositories, see _readconf()
+    conf = os.environ.get("PMS_PACMAN_CONF", "/etc/pacman.conf")  # e.g. for pms_bench.py
+
+    @Timer("_get_installed")
     def _get_installed(self):
         if self.Installed: return
+        local = self._read_local()
+        if local is None:
+            self._get_installed_pacman()
+            return
+        installed = dict(zip(local.name, local.ver))
+        # "Provided" packagenames/version.
+        for prov in local.prov:
+            for y in prov.split():
+                pv = y.split("=")
+                if pv[0] not in installed:
+                    installed[pv[0]] = pv[1] if len(pv) > 1 else None
+        self.Installed = installed
+
+
+    def _get_installed_pacman(self):
+        """same as _get_installed(), but ask pacman"""
         self.Installed = dict(x.split() for x in cmd("pacman", ["-Q"]))
         # "Provided" packagenames/version. Etwas langsamer.
         for x in cmd("pacman", ["-Qi"]):
@@ -605,69 +2399,462 @@ class PacPkg(Pkg):
                     self.Installed[pv[0]] = pv[1] if len(pv) > 1 else None
 
 
-    def search(self, search="."):
+    def _readconf(self):
         """
-        Perform a search in local and remot databases.
-        The results are stored in self.rows. Use to_*() functions to retrieve.
+        get repositories (in order) and DBPath from pacman.conf,
+        unless self.dbpath is set already.
         """
-        def get_foreign():
-            rows = []
-            cur = {}
-            for l in cmd("pacman", ["-Qmi"]):
-                if l:       # collect info
-                    if ":" not in l: continue
-                    cur.update(((x.strip() for x in l.split(":", maxsplit=1)),))
-                elif cur:   # new entry is about to start
-                    cur['Groups'] = cur['Groups'].replace('None', '')
-                    gr_ds = f"{cur['Groups']} {cur['Name']} {cur['Description']}"
-                    if self.regex.search(gr_ds):
-                        rows += [Pkg.Row(Style.ext_str, cur["Name"], cur["Version"],
-                            cur["Groups"] or None, "installed", None, cur["Description"]
-                        )]
-                    cur = {}
-            return rows
-
-        def get_sync():
-            # repack 2 consecutive lines
+        if self.repos is not None: return
+        dbpath, repos = self.dbpath, []
+        try:
+            with open(self.conf) as f:
+                for l in f:
+                    l = l.split("#", 1)[0].strip()
+                    if l.startswith("[") and l.endswith("]") and l != "[options]":
+                        repos.append(l[1:-1])
+                    elif l.startswith("DBPath") and "=" in l and self.dbpath is None:
+                        dbpath = l.split("=", 1)[1].strip()
+        except OSError:
+            pass
+        self.dbpath = dbpath or "/var/lib/pacman"
+        self.repos = repos
+
+
+    def _syncdbs(self):
+        """list of (repo, path to sync-database) in the order of pacman.conf"""
+        self._readconf()
+        syncdir = os.path.join(self.dbpath, "sync")
+        found = [f[:-3] for f in sorted(os.listdir(syncdir)) if f.endswith(".db")]
+        # pacman only uses configured repos, stale databases are ignored
+        return [(r, os.path.join(syncdir, r + ".db")) for r in (self.repos or found) if r in found]
+
+
+    def _read_sync(self):
+        """
+        Read all sync-databases into a column-oriented table (PacPkg.Sync).
+        The table is kept in PacPkg.SyncTable and in a cache-file, which is
+        valid as long as no sync-database has changed. Returns None if the
+        databases can't be read natively (e.g. no zstd available).
+        """
+        with PacPkg._synclock:
+            if PacPkg.SyncTable is not None: return PacPkg.SyncTable
             try:
-                pm = cmd("pacman", ["-Ss", self.regex.pattern])
-            except subprocess.CalledProcessError:
-                pm = []
-            pacsync = "\n".join(pm).replace("\n    ", " »» ").splitlines()
-            pattern = r"^([^ ]+?)/([^ ]+?) ([^ ]+?)(?: \((.+?)\))?(?: \[(installed)(?:\]|: ([^ ]+?)\]))? »» (.+)$"
-            return [
-                Pkg.Row(*re.match(pattern, entry).groups())
-                for entry in pacsync if self.regex.search(entry)
-            ]
-
-        self.regex = re.compile(search, re.IGNORECASE)
-        self._cols = None
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            f1 = executor.submit(get_foreign)
-            f2 = executor.submit(get_sync)
-            self.rows = f1.result() + f2.result()
-            self.rows.sort(key=lambda x: x.pkg)
-
-
-    def _get_packagefiles(self, name, width=80, height=25):
+                dbs = self._syncdbs()
+                key = filekey(p for _, p in dbs)
+            except OSError:
+                return None
+            if not dbs: return None
+
+            cached = cache_read("sync", key)
+            if cached:
+                PacPkg.SyncTable = table_load(PacPkg.Sync, cached[1], cached[0]["n"])
+                PacPkg.SyncKey = key
+                return PacPkg.SyncTable
+
+            def readdb(path):   # decompression releases the GIL
+                with open(path, "rb") as f: return decompress(f.read())
+
+            import concurrent.futures
+            table = PacPkg.Sync([], [], [], [], [], [])
+            try:
+                with concurrent.futures.ThreadPoolExecutor() as executor:
+                    for (repo, _), data in zip(dbs, executor.map(readdb, (p for _, p in dbs))):
+                        for name, body in untar(data):
+                            if not name.endswith("/desc"): continue
+                            d = pacdesc(body.decode("utf-8", "replace"))
+                            table.repo.append(repo)
+                            table.name.append(d["NAME"][0])
+                            table.ver.append(d["VERSION"][0])
+                            table.grps.append(" ".join(d.get("GROUPS", ())))
+                            table.desc.append(" ".join(d.get("DESC", ())))
+                            table.prov.append(" ".join(d.get("PROVIDES", ())))
+            except (OSError, KeyError, ValueError, subprocess.CalledProcessError):
+                return None
+            cache_write("sync", key, table_dump(table), n=len(table.name))
+            PacPkg.SyncTable, PacPkg.SyncKey = table, key
+            return table
+
+
+    def _filesdbs(self):
+        """files-databases [(repo, path)], the local database and their cache-key"""
+        dbs = [(r, p[:-3] + ".files") for r, p in self._syncdbs()]
+        dbs = [(r, p) for r, p in dbs if os.path.exists(p)]
+        localdir = os.path.join(self.dbpath, "local")
+        # directory mtime changes on every (un)install and upgrade
+        return dbs, localdir, filekey([p for _, p in dbs] + [localdir])
+
+
+    def _read_files(self, wait=True):
+        """
+        Build a FileIndex of all files-databases and the local database (repo
+        "local"). It is kept in PacPkg.FileTable and in a cache-file, which is
+        rebuilt as soon as a database changes. Returns None if the databases
+        can't be read natively. Unless wait is set, only a valid cache-file
+        is used (it's just mapped), otherwise the index is built in background
+        and None is returned until it's ready.
+        """
+        if not wait:
+            if PacPkg.FileTable is None and not PacPkg._fileslock.locked():
+                try: index = FileIndex.load("files", self._filesdbs()[2])
+                except OSError: index = None
+                if index is not None: PacPkg.FileTable = index
+                else: threading.Thread(target=self._read_files, daemon=True).start()
+            return PacPkg.FileTable
+        with PacPkg._fileslock:
+            if PacPkg.FileTable is not None: return PacPkg.FileTable
+            try: dbs, localdir, key = self._filesdbs()
+            except OSError: return None
+
+            index = FileIndex.load("files", key)
+            if index is not None:
+                PacPkg.FileTable = index
+                return index
+
+            def entries():
+                for name, ver in self._local_versions().items():
+                    try:
+                        with open(os.path.join(localdir, f"{name}-{ver}", "files"),
+                                  encoding="utf-8", errors="replace") as f:
+                            files = pacdesc(f.read()).get("FILES", [])
+                    except OSError:
+                        continue
+                    yield "local", name, ["/" + x for x in files]
+                # one after another: files-databases are quite big
+                for repo, path in dbs:
+                    with open(path, "rb") as f: data = decompress(f.read())
+                    for member, body in untar(data):
+                        if not member.endswith("/files"): continue
+                        files = pacdesc(body.decode("utf-8", "replace")).get("FILES", [])
+                        yield repo, member.rsplit("/", 1)[0].rsplit("-", 2)[0], ["/" + x for x in files]
+
+            try:
+                PacPkg.FileTable = FileIndex.build("files", key, entries())
+            except (OSError, ValueError, subprocess.CalledProcessError):
+                return None
+            return PacPkg.FileTable
+
+
+    def _local_versions(self):
+        """
+        `pkgname` => "version" of all installed packages. The local database
+        uses "name-pkgver-pkgrel" as directory names, so no need to read
+        anything but the directory itself. The result is kept until the
+        directory changes (on every (un)install and upgrade).
+        """
+        self._readconf()
+        localdir = os.path.join(self.dbpath, "local")
+        try:
+            key = filekey([localdir])
+            if PacPkg.LocalVersions[0] == key: return PacPkg.LocalVersions[1]
+            entries = os.listdir(localdir)
+        except OSError:
+            return {}
+        res = {}
+        for e in entries:
+            nvr = e.rsplit("-", 2)
+            if len(nvr) == 3: res[nvr[0]] = f"{nvr[1]}-{nvr[2]}"
+        PacPkg.LocalVersions = key, res
+        return res
+
+
+    def _read_local(self, names=None):
+        """
+        Read desc-files of the local database into a PacPkg.Sync table (repo
+        is always Style.ext_str). Only the given packagenames are read, if
+        specified. Returns None if the local database can't be read.
+        """
+        versions = self._local_versions()
+        if not versions: return None
+        localdir = os.path.join(self.dbpath, "local")
+        table = PacPkg.Sync([], [], [], [], [], [])
+        try:
+            for name in versions if names is None else names:
+                with open(os.path.join(localdir, f"{name}-{versions[name]}", "desc"),
+                          encoding="utf-8", errors="replace") as f:
+                    d = pacdesc(f.read())
+                table.repo.append(Style.ext_str)
+                table.name.append(d["NAME"][0])
+                table.ver.append(d["VERSION"][0])
+                table.grps.append(" ".join(d.get("GROUPS", ())))
+                table.desc.append(" ".join(d.get("DESC", ())))
+                table.prov.append(" ".join(d.get("PROVIDES", ())))
+        except (OSError, KeyError):
+            return None
+        return table
+
+
+    @staticmethod
+    def _ssline(r):
+        """recreate the line `pacman -Ss` would print for a Row (joined to one line)"""
+        line = f"{r.db}/{r.pkg} {r.ver}"
+        if r.grps: line += f" ({r.grps})"
+        if r.ins: line += f" [installed: {r.old}]" if r.old else " [installed]"
+        return f"{line} »» {r.desc}"
+
+
+    def _search_sync(self, names=None):
+        """
+        search the sync-databases natively, yielding the same rows as
+        `pacman -Ss` (see _search_pacman). If names is given, the packages
+        with these names are listed instead.
+        """
+        table = self._read_sync()
+        if table is None: return self._search_pacman(names)
+        local = self._local_versions()
+        rx = self.regex.search
+        query = self.query.match if self.query is not None and names is None else None
+        rows = []
+        found = None if names is not None else self._candidates("sync.tri", PacPkg.SyncKey,
+            lambda: zip(table.name, table.desc, table.grps, table.prov))
+        for i in range(len(table.name)) if found is None else found:
+            name = table.name[i]
+            if names is not None:
+                if name not in names: continue
+            # pacman matches name, description and names of provides...
+            elif query is None and not (rx(name) or rx(table.desc[i]) or
+                      any(rx(p.split("=", 1)[0]) for p in table.prov[i].split())):
+                continue
+            lver = local.get(name)
+            row = Pkg.Row(table.repo[i], name, table.ver[i], table.grps[i] or None,
+                "installed" if lver else None,
+                lver if lver and lver != table.ver[i] else None,
+                table.desc[i]
+            )
+            # ...and we match the whole line as well.
+            if query is not None:
+                if query(row): rows.append(row)
+            elif names is not None or rx(self._ssline(row)): rows.append(row)
+        return rows
+
+
+    def _search_pacman(self, names=None):
+        """search the sync-databases by calling `pacman -Ss` (names: see _search_sync)"""
+        if names is not None and not names: return []
+        try:
+            pm = cmd("pacman", ["-Ss", self._sspattern(names)])
+        except subprocess.CalledProcessError:
+            pm = []
+        return self._ssrows(pm, {}, names)
+
+
+    def _sspattern(self, names=None):
+        """searchterm for `pacman -Ss`"""
+        if names is None: return self.regex.pattern if self.query is None else self.query.pattern
+        return f"^({'|'.join(map(re.escape, names))})$"
+
+
+    def _ssrows(self, lines, state, names=None):
+        """
+        parse lines of `pacman -Ss` into rows. Each entry has 2 lines, the
+        first one is kept in state (a dict) in case the lines end in between.
+        """
+        pattern = r"^([^ ]+?)/([^ ]+?) ([^ ]+?)(?: \((.+?)\))?(?: \[(installed)(?:\]|: ([^ ]+?)\]))? »» (.+)$"
+        rows = []
+        for l in lines:
+            if not l.startswith("    "):
+                state["head"] = l
+                continue
+            # repack 2 consecutive lines
+            entry = f"{state.get('head')} »» {l[4:]}"
+            if names is None and self.query is None and not self.regex.search(entry): continue
+            row = Pkg.Row(*re.match(pattern, entry).groups())
+            if names is not None: wanted = row.pkg in names
+            else: wanted = self.query is None or self.query.match(row)
+            if wanted: rows.append(row)
+        return rows
+
+
+    def _search_outdated(self):
+        """
+        installed packages with a newer version in the sync-databases (like
+        `pacman -Qu`), matching the searchterm. The local database is joined
+        with the sync-table by name, the first repository having a package
+        wins (like pacman does).
+        """
+        table = self._read_sync()
+        if table is None: return self._search_outdated_pacman()
+        # reversed: the first index of a name is the one kept
+        first = dict(zip(reversed(table.name), range(len(table.name) - 1, -1, -1)))
+        rows = []
+        for name, lver in self._local_versions().items():
+            i = first.get(name)
+            if i is None or vercmp(table.ver[i], lver) <= 0: continue
+            row = Pkg.Row(table.repo[i], name, table.ver[i], table.grps[i] or None,
+                "installed", lver, table.desc[i])
+            if self.query.match(row) if self.query is not None else self.regex.search(self._ssline(row)):
+                rows.append(row)
+        return rows
+
+
+    @staticmethod
+    def outdated(row):
+        """row has a newer version in the sync-databases (row.old is the installed one)"""
+        return bool(row.old) and vercmp(row.ver, row.old) > 0
+
+
+    def _search_outdated_pacman(self):
+        """same as _search_outdated(), but ask pacman"""
+        try:
+            names = {l.split()[0] for l in cmd("pacman", ["-Qu"]) if l}
+        except subprocess.CalledProcessError:   # nothing to upgrade
+            return []
+        return [r for r in self._search_pacman(names) if self.outdated(r) and
+                (self.query.match(r) if self.query is not None else self.regex.search(self._ssline(r)))]
+
+
+    def _search_foreign(self, names=None):
+        """
+        search installed packages which are not in any sync-database
+        (like `pacman -Qm`). Only their desc-files have to be read.
+        names: see _search_sync()
+        """
+        table = self._read_sync()
+        if table is None: return self._search_foreign_pacman(names)
+        versions = self._local_versions()
+        key = PacPkg.SyncKey, PacPkg.LocalVersions[0]
+        if PacPkg.ForeignTable[0] != key:     # read again after (un)installs
+            syncnames = set(table.name)
+            PacPkg.ForeignTable = key, self._read_local([n for n in versions if n not in syncnames])
+        foreign = PacPkg.ForeignTable[1]
+        if foreign is None: return []
+        rows = []
+        for i, name in enumerate(foreign.name):
+            row = Pkg.Row(Style.ext_str, name, foreign.ver[i],
+                foreign.grps[i] or None, "installed", None, foreign.desc[i])
+            if self._foreign_match(row, names): rows.append(row)
+        return rows
+
+
+    def _search_foreign_pacman(self, names=None):
+        """same as _search_foreign(), but ask pacman"""
+        return self._qmirows(cmd("pacman", ["-Qmi"]) + [""], {}, names)
+
+
+    def _qmirows(self, lines, cur, names=None):
+        """
+        parse lines of `pacman -Qmi` into rows. The entry which is not
+        complete yet is kept in cur (a dict).
+        """
+        rows = []
+        for l in lines:
+            if l:       # collect info
+                if ":" not in l: continue
+                cur.update(((x.strip() for x in l.split(":", maxsplit=1)),))
+            elif cur:   # new entry is about to start
+                cur['Groups'] = cur['Groups'].replace('None', '')
+                row = Pkg.Row(Style.ext_str, cur["Name"], cur["Version"],
+                    cur["Groups"] or None, "installed", None, cur["Description"])
+                if self._foreign_match(row, names): rows.append(row)
+                cur.clear()
+        return rows
+
+
+    def _foreign_match(self, row, names=None):
+        """should row of a foreign package be listed? (names: see _search_sync)"""
+        if names is not None: return row.pkg in names
+        if self.query is not None: return self.query.match(row)
+        return bool(self.regex.search(f"{row.grps or ''} {row.pkg} {row.desc}"))
+
+
+    async def stream(self, search="."):
+        """
+        search local and sync-databases concurrently and yield the rows
+        (in batches) as soon as they are found.
+        """
+        import asyncio
+        self._compile(search)
+        if self.upgrades:   # foreign packages can't be outdated
+            yield await asyncio.to_thread(self._search_outdated)
+            return
+        async for rows in amerge(self._stream_foreign(), self._stream_sync()):
+            yield rows
+
+
+    async def _stream_sync(self):
+        """like _search_sync(), but parse `pacman -Ss` while it's running"""
+        import asyncio
+        if await asyncio.to_thread(self._read_sync) is not None:
+            yield await asyncio.to_thread(self._search_sync)
+            return
+        state = {}
+        async for lines in acmd("pacman", ["-Ss", self._sspattern()]):
+            rows = self._ssrows(lines, state)
+            if rows: yield rows
+
+
+    async def _stream_foreign(self):
+        """like _search_foreign(), but parse `pacman -Qmi` while it's running"""
+        import asyncio
+        if await asyncio.to_thread(self._read_sync) is not None:
+            yield await asyncio.to_thread(self._search_foreign)
+            return
+        cur = {}
+        async for lines in acmd("pacman", ["-Qmi"]):
+            rows = self._qmirows(lines, cur)
+            if rows: yield rows
+        rows = self._qmirows([""], cur)
+        if rows: yield rows
+
+
+    def _search(self, search):
+        """like stream(), but without asyncio if the databases can be read natively"""
+        self._compile(search)
+        if self.upgrades: return self._search_outdated()
+        if self._read_sync() is None: return super()._search(search)
+        return self._collect()
+
+
+    def _collect(self, names=None):
+        """
+        search foreign and sync packages, returns the rows. One after another:
+        both are quick with the tables in memory, not worth a thread pool.
+        """
+        return sorted(self._search_foreign(names) + self._search_sync(names), key=lambda x: x.pkg)
+
+
+    def owns(self, pattern):
+        """
+        Find packages owning files matching pattern: an absolute path or glob
+        or just a filename (glob) like `ls` or `*.desktop`. Installed packages
+        are checked as well as the files-databases. Like search(), the
+        results are stored in self.rows.
+        """
+        index = self._read_files()
+        if index is not None:
+            names = {n for _, n, _ in index.owners(pattern)}
+        else:   # ask pacman. only works for exact paths (no globs) or names
+            names = set()
+            for q in (["-Qoq", pattern], ["-Fq", pattern]):
+                try: names.update(l.rsplit("/", 1)[-1] for l in cmd("pacman", q) if l)
+                except subprocess.CalledProcessError: pass
+        # highlight the package-names
+        alt = "|".join(map(re.escape, sorted(names, key=len, reverse=True)))
+        self.regex = re.compile(rf"(?<![\w@.+-])(?:{alt})(?![\w@.+-])" if names else "(?!)")
+        self.rows = self._collect(names)
+
+
+    def _get_packagefiles(self, name):
+        index = self._read_files(wait=False)   # don't wait for a rebuild
+        files = index.files(name) if index is not None else None
+        if files is not None: return files
         try:
             return cmd("pacman", ["-Qlq", name])
         except subprocess.CalledProcessError:
             try:      # try pkgfile first (is faster) but may be not installed
                 return cmd("pkgfile", ["-lq", name])
             except FileNotFoundError:
-                try:
-                    return cmd("pacman", ["-Flq", name])
-                except subprocess.CalledProcessError as spe:
-                    err = [f"pacman returned exitcode {spe.returncode}",""]
-                    err += spe.stdout.splitlines() + spe.stderr.splitlines()
-                    return columnize(err, width, height)
-            except subprocess.CalledProcessError as spe:
-                err = [f"pkgfile returned exitcode {spe.returncode}",""]
-                err += spe.stdout.splitlines() + spe.stderr.splitlines()
-                return columnize(err, width, height)
+                return cmd("pacman", ["-Flq", name])
+
+
+    def _get_info(self, name):
+        try:
+            return cmd("pacman", ["-Qi", name])
+        except subprocess.CalledProcessError:
+            # maybe not installed
+            return cmd("pacman", ["-Sii", name])
 
 
+    @Timer("info")
     def info(self, name, width=80, height=25):
         """
         show fancy package-info.
@@ -675,14 +2862,9 @@ class PacPkg(Pkg):
         """
         if width < 40: return ["Width too small"]
         try:
-            pacinfo = cmd("pacman", ["-Qi", name])
-        except subprocess.CalledProcessError:
-            try:  # maybe a foreign package
-                pacinfo = cmd("pacman", ["-Sii", name])
-            except subprocess.CalledProcessError as spe:
-                err = [f"pacman returned exitcode {spe.returncode}",""]
-                err += spe.stdout.splitlines() + spe.stderr.splitlines()
-                return columnize(err, width, height)
+            pacinfo = self._fetch("_get_info", name).result()
+        except subprocess.CalledProcessError as spe:
+            return columnize(errlines(spe), width, height)
 
         if not pacinfo: return [f"No such package »{name}«"]
 
@@ -691,14 +2873,7 @@ class PacPkg(Pkg):
         # Dies sind Paketlisten und werden anders formatiert:
         plists = ("Depends On", "Required By", "Optional For", "Replaces", "Conflicts With")
 
-        if not self.Installed: self._get_installed()
-
-        # TODO: check version instead of ignoring
-        def nover(x):
-            return re.split("[<=>]", x, maxsplit=1)[0]
-
-        def getnover(x):
-            return nover(x), Style.ins if nover(x) in self.Installed else Style.pkg
+        self.installed().result()
 
         info = {}
         last = ""
@@ -719,14 +2894,20 @@ class PacPkg(Pkg):
         for k, v in info.items():
             if k in hfields: continue
             txt = []
-            for r in v.split("\n"):
+            lines = v.split("\n")
+            if k == "Optional Deps":    # check all of them at once
+                states = self._depstates([l.split(": ", 1)[0] for l in lines], vercmp)
+            for n, r in enumerate(lines):
                 lw = [x for x in wrap(r, width - CW)]
                 if k == "Optional Deps":
                     odh = lw[0].split(": ", maxsplit=1)
                     if len(odh) == 2:
-                        lw[0] = f"{fg(odh[0], Style.pkg if odh[0] not in self.Installed else Style.ins)}: {odh[1]}"
-                elif k in plists:   # colorize package-list
-                    lw = columnize([getnover(x) for x in r.split()], width - CW)
+                        lw[0] = f"{fg(*states[n])}: {odh[1]}"
+                elif k == "Depends On":     # colorize package-list, check versions
+                    lw = columnize(self._depstates(r.split(), vercmp), width - CW)
+                elif k in plists:   # no versions or constraints which aren't dependencies
+                    names = [re.split("[<=>]", x, maxsplit=1)[0] for x in r.split()]
+                    lw = columnize([(x, Style.ins if x in self.Installed else Style.pkg) for x in names], width - CW)
 
                 txt += lw
             if not txt: continue
@@ -761,11 +2942,27 @@ class PacPkg(Pkg):
 
     def updateDB(self):
         sudocmd("pacman", ["-Sy"])
+        # rebuild search-cache while files-databases are updated
+        PacPkg.SyncTable = None
+        threading.Thread(target=self._read_sync, daemon=True).start()
         try:
             cmd("pkgfile", ["-V"])
             sudocmd("pkgfile", ["-u"])
         except:
             sudocmd("pacman", ["-Fy"])
+        PacPkg.FileTable = None
+        self._read_files(wait=False)
+
+
+    def dbfiles(self):
+        self._readconf()
+        return ([os.path.join(self.dbpath, "sync"), os.path.join(self.dbpath, "local")]
+                + [p for _, p in self._syncdbs()])
+
+
+    def forget(self):
+        PacPkg.SyncTable = PacPkg.SyncKey = PacPkg.FileTable = None
+        PacPkg.LocalVersions, PacPkg.ForeignTable = (None, {}), (None, None)
 
 
     def uninstall(self, pkglist): 
@@ -777,6 +2974,191 @@ class PacPkg(Pkg):
 
 
 
+#┌─────────────────────────────────────────────────────────────────────────────┐
+#│                                    DAEMON                                   │
+#└─────────────────────────────────────────────────────────────────────────────┘
+class Daemon:
+    """
+    Keep a backend (its tables, installed packages and indexes) in memory and
+    answer requests of RemotePkg on a unix socket: one JSON-object each way,
+    one request per connection. Connections are handled in threads, the
+    backend by one request at a time. The databases are checked for changes
+    before each request and every few seconds while idle, everything is
+    read again if they have changed.
+    """
+    interval = 5        # seconds between checks of the databases while idle
+    timeout = 10        # seconds a client may take for sending a request
+
+    def __init__(self, pkg):
+        self.pkg = pkg
+        self.key = False    # filekey() of pkg.dbfiles() (False: nothing read yet)
+        self.lock = threading.Lock()    # for self.pkg
+
+
+    @staticmethod
+    def path():
+        """path of the socket, in our cache-directory"""
+        return cachefile("daemon.sock")
+
+
+    def check(self):
+        """start over with a fresh backend if the databases have changed"""
+        with self.lock: self._check()
+
+
+    def _check(self):
+        try:
+            key = filekey(self.pkg.dbfiles())
+        except OSError:
+            key = None
+        if key == self.key: return
+        self.pkg.shutdown()
+        self.pkg.forget()
+        self.pkg, self.key = type(self.pkg)(), key
+        # read everything now, not on the first request
+        self.pkg.search(".")
+        self.pkg.installed().result()
+
+
+    def answer(self, req):
+        """answer to a request (dict), see RemotePkg"""
+        with self.lock:
+            self._check()
+            pkg = self.pkg
+            pkg.queries, pkg.fuzzy, pkg.upgrades = req["queries"], req["fuzzy"], req["upgrades"]
+            try:
+                if req["op"] in ("search", "owns"):
+                    getattr(pkg, req["op"])(req["term"])
+                    return {"rows": pkg.rows, "pattern": pkg.regex.pattern, "flags": pkg.regex.flags}
+                # info is colored with our Style, the client's may differ
+                if req["style"] != Style.__name__: return {"error": f"not in {req['style']}"}
+                fun = pkg.info if req["op"] == "info" else pkg.filelist
+                return {"lines": fun(req["name"], req["width"], req["height"])}
+            except Exception as e:      # the client will try itself
+                return {"error": f"{type(e).__name__}: {e}"}
+
+
+    def serve(self):
+        """answer requests until interrupted (or terminated)"""
+        import json, signal, socketserver
+        path = self.path()
+        if RemotePkg.connect() is not None: sys.exit(f"pms: daemon already running on {path}")
+        if os.path.exists(path): os.remove(path)    # stale
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            timeout = daemon.timeout
+            def handle(self):
+                try:
+                    req = json.loads(self.rfile.readline())
+                    self.wfile.write(json.dumps(daemon.answer(req)).encode() + b"\n")
+                except (OSError, ValueError):   # timeout, client gone, garbage
+                    pass
+
+        self.check()
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit())
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            server.daemon_threads = True
+            os.chmod(path, 0o600)
+            server.timeout, server.handle_timeout = self.interval, self.check
+            print(f"pms: {type(self.pkg).__name__} serving on {path}", file=sys.stderr)
+            try:
+                while True: server.handle_request()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.remove(path)
+
+
+class RemotePkg(Pkg):
+    """
+    search(), owns(), info() and filelist() answered by a running Daemon.
+    Rows are formatted here, like with any backend. Whatever the daemon
+    can't answer (no daemon anymore, errors) is done by the backend itself.
+    """
+    def __init__(self):
+        super().__init__()
+        self.backend = None     # see _local()
+
+
+    @staticmethod
+    def _socket():
+        """socket connected to the daemon, None if there is none"""
+        import socket
+        sock = socket.socket(socket.AF_UNIX)
+        try:
+            sock.connect(Daemon.path())
+        except OSError:
+            sock.close()
+            return None
+        return sock
+
+
+    @classmethod
+    def connect(cls):
+        """a RemotePkg, None if no daemon is running"""
+        sock = cls._socket()
+        if sock is None: return None
+        sock.close()
+        return cls()
+
+
+    @Timer("daemon")
+    def _ask(self, op, **req):
+        """answer of the daemon (dict), None if it has none"""
+        import json
+        req.update(op=op, queries=self.queries, fuzzy=self.fuzzy, upgrades=self.upgrades)
+        sock = self._socket()
+        if sock is None: return None
+        try:
+            with sock, sock.makefile("rwb") as f:
+                f.write(json.dumps(req).encode() + b"\n")
+                f.flush()
+                res = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        return None if "error" in res else res
+
+
+    def _local(self):
+        """the backend itself (with the same settings)"""
+        if self.backend is None:
+            PkgMgr = {"apt": AptPkg, "pacman": PacPkg}.get(pkgmanager())
+            assert PkgMgr is not None, "Could not detect packagemanager"
+            self.backend = PkgMgr()
+        self.backend.queries, self.backend.fuzzy, self.backend.upgrades = self.queries, self.fuzzy, self.upgrades
+        return self.backend
+
+
+    def _remote(self, op, term):
+        """search() or owns(), by the daemon if possible"""
+        res = self._ask(op, term=term)
+        if res is None:
+            local = self._local()
+            getattr(local, op)(term)
+            self.rows, self.regex = local.rows, local.regex
+        else:
+            self.rows = [Pkg.Row(*r) for r in res["rows"]]
+            self.regex = re.compile(res["pattern"], res["flags"])
+
+
+    def search(self, search="."): self._remote("search", search)
+    def owns(self, pattern): self._remote("owns", pattern)
+    def prefetch(self, names): pass     # the daemon has everything at hand
+
+
+    def info(self, name, width=80, height=25):
+        res = self._ask("info", name=name, width=width, height=height, style=Style.__name__)
+        return res["lines"] if res else self._local().info(name, width, height)
+
+
+    def filelist(self, name, width=80, height=25):
+        res = self._ask("filelist", name=name, width=width, height=height, style=Style.__name__)
+        return res["lines"] if res else self._local().filelist(name, width, height)
+
+
+
 #┌─────────────────────────────────────────────────────────────────────────────┐
 #│                              INTERACTIVE MODE                               │
 #└─────────────────────────────────────────────────────────────────────────────┘
@@ -789,12 +3171,20 @@ class LineSelect():
         return fg(k, Style.footerkey) + fg(f": {t}", Style.footertxt)
 
 
-    def __init__(self, pkg):
+    def __init__(self, pkg, search=None, owns=None):
+        """
+        show pkg.rows or, if search is given, the results of pkg.stream(search)
+        while they arrive. owns: pattern pkg.rows were found by (pkg.owns),
+        to find them again after updating the databases.
+        """
         self.pkg = pkg
         keys = [
             ["Space", "Select"],
+            ["/", "Filter"],
             ["F1", "Info"],
             ["F2", "Files"],
+            ["F3", "Fuzzy"],
+            ["F4", "Query" if pkg.queries else "Search"],
             ["F5", "Update DB"],
             ["Esc/F10", "Quit"],
         ]
@@ -805,15 +3195,103 @@ class LineSelect():
         except OSError:
             self.cols, self.rows = 80, 25
 
-        lines = self.pkg.to_list(self.cols-1) # bei langen listen dauert das!
-        self.header = lines[0][0]
-        self.items = lines[1:]
+        # rows are formatted on demand, see display()
+        if search is not None: self.pkg.rows = []
+        self.items = self.pkg.lines(self.cols-1)
+        self.header = self.items.header
         self.doscrollbar = False
 
         self._cursor = 0        # current cursor position
         self._offset = 0        # skip first n items in list (scrolled down)
-        self.selected = set()   # keep track of selected row indices
-        self.installed = set(i for i, r in enumerate(self.pkg.rows) if r.ins)
+        self.screen = None      # lines currently on the terminal (see display)
+        self.lastframe = 0      # time when last frame was drawn
+        self.frametime = None   # average time needed for drawing a frame
+        self.jumpscroll = False # scroll half a page at once (slow terminal)
+        self.prefetched = None  # cursor position of last prefetch
+        self.selected = {}      # (repo, name) of selected rows => installed
+        self.prompt = None      # [label, text, done, changed] while asking for input
+        self.query = None       # current searchterm
+        self.owns = owns        # pattern of pkg.owns(), if there is no searchterm
+        self.all = self.pkg.rows    # all results, self.pkg.rows is filtered
+        self.filter = None      # RowFilter for self.all, see refilter()
+        self.ranked = None      # best rows of self.all, if pkg.fuzzy is set
+        self.fuzzy = None       # Fuzzy for self.all, kept while rows are added
+        self.filtertext = ""
+        self.loader = None      # running search, see load()
+        self.follow = None      # (repo, name) of row to put cursor on when found
+        self.searches = 0       # number of searches started
+        self.nothing = False    # first search did not find anything
+        if search is not None: self.load(search)
+
+
+    def key(self, i):
+        """(repo, name) of a row. used for selections (rows may move)"""
+        r = self.pkg.rows[i]
+        return r.db, r.pkg
+
+
+    def update(self, rows):
+        """
+        show rows (sorted by name) instead of the current ones. The cursor
+        stays on its row (or goes to self.follow), if that is still there.
+        """
+        target = self.follow
+        if target is None and len(self.items) and (self.cursor or self.offset):
+            target = self.key(self.cursor)  # (at the top, stay there)
+        self.pkg.rows = rows
+        self.items = self.pkg.lines(self.cols-1)
+        self.header = self.items.header
+        for i, r in enumerate(rows):
+            if (r.db, r.pkg) == target:
+                self.cursor, self.follow = i, None
+                break
+        else:
+            self.cursor = self.cursor   # keep it in range and in view
+
+
+    def load(self, search):
+        """start a new search, rows are shown as they arrive (see poll())"""
+        if self.loader is not None: self.loader.cancel()
+        if len(self.items): self.follow = self.key(self.cursor)
+        self.query = search
+        self.searches += 1
+        self.loader = Loader(self.pkg, search)
+        self.all, self.filter, self.ranked, self.fuzzy = [], None, None, None
+        self.refilter()
+
+
+    def refilter(self, text=None):
+        """
+        show rows of self.all matching the filter (self.filtertext or text).
+        the RowFilter is only built when needed and kept until rows change.
+        """
+        if text is not None: self.filtertext = text
+        rows = self.all
+        if self.pkg.fuzzy:
+            if self.fuzzy is None: self.fuzzy = Fuzzy(self.all)
+            if self.ranked is None: self.ranked = self.fuzzy.rank(self.query)
+            rows = self.ranked
+        if not self.filtertext.strip():
+            self.update(rows)
+            return
+        if self.filter is None: self.filter = RowFilter(rows)
+        self.update([rows[i] for i in self.filter.match(self.filtertext)])
+
+
+    def poll(self):
+        """add rows found by the running search. returns True if anything changed"""
+        if self.loader is None: return False
+        done, rows = self.loader.done, self.loader.take()
+        if rows:
+            self.all = sorted(self.all + rows, key=lambda x: x.pkg)
+            self.filter, self.ranked = None, None
+            if self.fuzzy is not None: self.fuzzy.add(rows)
+            self.refilter()
+        if done:
+            if self.loader.error: self.header = fg(f" {self.loader.error}\033[K", 9)
+            elif self.searches == 1 and not self.pkg.rows: self.nothing = True
+            self.loader, self.follow = None, None
+        return bool(rows) or done
 
 
     @property
@@ -822,8 +3300,8 @@ class LineSelect():
     @items.setter
     def items(self, val):
         self._items = val
-        # calculate number of displayed lines
-        self.height = sum(len(x) for x in val or [[]])
+        # number of displayed lines
+        self.height = val.index.total
 
 
     @property
@@ -837,11 +3315,12 @@ class LineSelect():
 
         # check if cursor is in view. scroll if neccessary
         maxh = self.rows - 2  # (header & footer)
-        crow = sum(len(x) for x in self.items[:self.cursor] or [[]])
+        # on slow terminals, jump to the middle instead of scrolling linewise
+        crow = self.items.index.prefix(self.cursor)
         if crow < self.offset + Style.scroll_padding:
-            self.offset = crow - Style.scroll_padding
+            self.offset = crow - (maxh // 2 if self.jumpscroll else Style.scroll_padding)
         if crow > self.offset + maxh - Style.scroll_padding - 1:
-            self.offset = crow - maxh + Style.scroll_padding + 1
+            self.offset = crow - (maxh // 2 if self.jumpscroll else maxh - Style.scroll_padding - 1)
 
 
     @property
@@ -856,84 +3335,102 @@ class LineSelect():
         self._offset = val
 
 
+    @Timer("display")
     def display(self):
         """
-        draw header, list, progressbar and footer
+        draw header, list, progressbar and footer.
+        Only terminal-lines which differ from the last frame are written (see
+        self.screen), set self.screen to None to force a full repaint.
         return first and last displayed item index
         """
-        # TODO: measure time: if terminal is slow, use jump-scroll.
-        # otherwise scroll row by row
-
-        out = sys.stdout.write
-        out(f"\033[H{self.header}\033[K\r\n")
-
         maxh = self.rows - 2
-
-        # render only what is visible... keep track of what is where
-        self.ymap = []
-        output = []
-        i = 0   # item index
-        r = 0   # rendered rows
-        f = -1  # first displayed item index
-        self.doscrollbar = False
-        while i < len(self.items):
-            fitm = self.items[i]
-            r += len(fitm)
-            if r > self.offset:
-                if f < 0: f = i
-                if r - self.offset < len(fitm): fitm = fitm[r - self.offset:]
-                color = csi(Style.zebra[i % len(Style.zebra)])
-                if i in self.selected:
-                    color += csi(Style.selected[i in self.installed])
-                if i == self.cursor:
-                    color += csi(Style.cursor)
-                output += [f"{color}{ir}{csi()}\r\n" for ir in fitm]
-                self.ymap += [i for _ in fitm]
-                if len(output) >= maxh:
-                    output = output[:maxh]
-                    self.doscrollbar = True
-                    break
+        frame = [f"{self.header}\033[K"]
+
+        # render only what is visible, starting with the (partially) visible
+        # item on top.
+        index = self.items.index
+        f = index.find(self.offset)         # first displayed item index
+        skip = self.offset - index.prefix(f)
+        i = f   # item index
+        while i < len(self.items) and len(frame) <= maxh:
+            fitm = self.items[i][skip:]     # formatted on demand
+            skip = 0
+            color = csi(Style.zebra[i % len(Style.zebra)])
+            if self.key(i) in self.selected:
+                color += csi(Style.selected[bool(self.pkg.rows[i].ins)])
+            if i == self.cursor:
+                color += csi(Style.cursor)
+            frame += [f"{color}{ir}{csi()}\033[K" for ir in fitm]
             i += 1
-        out("".join(output))
-        out(f"\033[J")
+        self.doscrollbar = len(frame) > maxh
+        frame = frame[:maxh + 1]
+        frame += ["\033[K"] * (maxh + 1 - len(frame))
+        i -= 1  # last displayed item index
 
-        # plot a scrollbar if needed
+        # add a scrollbar if needed
         if self.doscrollbar:
-            top = int(f / len(self.items) * maxh * 2) / 2
-            low = int(i / len(self.items) * maxh * 2) / 2
+            top = int(self.offset / self.height * maxh * 2) / 2
+            low = int(((self.offset + maxh) / self.height * maxh - 1) * 2) / 2
             def gx(x):
                 if x + 0.5 < top or x - 0.5 > low: return " "
                 if x < top: return "▄"
                 if x > low: return "▀"
                 return "█"
-            sh = "".join(f"\033[{x+2};{self.cols}H" + gx(x) for x in range(maxh))
-            out(csi(Style.scrollbar)+sh+csi())
-        else:
-            sh = "".join(f"\033[{x+2};{self.cols}H " for x in range(maxh))
-            out(csi()+sh)
+            for x in range(maxh):
+                frame[x + 1] += f"\033[{x+2};{self.cols}H{csi(Style.scrollbar)}{gx(x)}{csi()}"
 
         # Footer: Keys on the left...
         action = ""
         if len(self.selected) > 0:
-            rem = len(self.selected.intersection(self.installed))
-            ins = len(self.selected.difference(self.installed))
+            rem = sum(self.selected.values())
+            ins = len(self.selected) - rem
             if rem > 0: action += fg(f"[- {rem}]", Style.footersel[1])+" "
             if ins > 0: action += fg(f"[+ {ins}]", Style.footersel[0])
             action = action.strip()
             action += " "*(11 - alen(action))    # at least 11 chars, like ↓
         else:
-            if self.cursor in self.installed: action = "Deinstall  "
-            else:                             action = "  Install  "
+            if len(self.items) and self.pkg.rows[self.cursor].ins:
+                action = "Deinstall  "
+            else:
+                action = "  Install  "
         keys = self.keystr("Return", action) + fg(*Style.footersep) + self.footer
-        out(f"\033[{self.rows}H"+bg(f"{keys}\033[K", Style.footerbg))
-
-        # ...current position on the right
-        info = f" {self.cursor+1:{len(str(len(self.items)))}} / {len(self.items)} "
-        out(f"\033[{self.rows};{self.cols - alen(info) + 1}H{csi(Style.scrollbar)}{info}{csi()}")
+        if self.prompt is not None:     # ...or the input-line
+            label, text, _, _ = self.prompt
+            keys = self.keystr(label, "") + fg(f"{text}█", 15)
+        footer = bg(f"{keys}\033[K", Style.footerbg)
+
+        # ...current position on the right (+ while still searching)
+        more = "+" if self.loader is not None else " "
+        info = f" {self.cursor+1:{len(str(len(self.items)))}} / {len(self.items)}{more}"
+        if len(self.items) != len(self.all): info += f"of {len(self.all)}{more}"
+        footer += f"\033[{self.rows};{self.cols - alen(info) + 1}H{csi(Style.scrollbar)}{info}{csi()}"
+        frame.append(footer)
+
+        # write changed lines only
+        if self.screen is None or len(self.screen) != len(frame):
+            self.screen = [None] * len(frame)
+        sys.stdout.write("".join(
+            f"\033[{y+1}H{line}" for y, (line, old) in enumerate(zip(frame, self.screen)) if line != old
+        ))
         sys.stdout.flush()
+        self.screen = frame
         return f, i
 
 
+    def visible(self):
+        """first and last (partially) displayed item index"""
+        index = self.items.index
+        last = index.find(self.offset + self.rows - 3)
+        return index.find(self.offset), min(last, len(self.items) - 1)
+
+
+    def itemat(self, y):
+        """index of the item displayed in terminal-row y (0 = header) or None"""
+        line = self.offset + y - 1
+        if y < 1 or y >= self.rows - 1 or line >= self.height: return None
+        return self.items.index.find(line)
+
+
     def findfirst(self, char):
         for i, r in enumerate(self.pkg.rows):
             if r.pkg.lower().startswith(char.lower()): return i
@@ -942,12 +3439,14 @@ class LineSelect():
 
     def mainloop(self, scr):
         """Mainloop must be called in curses.wrapper"""
+        import curses
         curses.curs_set(0)
         curses.mousemask(-1)
 
         def toggle(x):
-            if x in self.selected:  self.selected.remove(x)
-            else:                   self.selected.add(x)
+            k = self.key(x)
+            if k in self.selected:  del self.selected[k]
+            else:                   self.selected[k] = bool(self.pkg.rows[x].ins)
 
         def showinfo(infofun):
             pkgname = self.pkg.rows[self.cursor].pkg
@@ -995,65 +3494,156 @@ class LineSelect():
                 offset = max(0, offset)
                 offset = min(offset, len(nfo) - nr)
             scr.timeout(100)    # reset getch-timeout to 100
+            self.screen = None  # infobox has to be removed
 
         def updateDB():
             self.pkg.updateDB()
             # reload package list but keep selection & cursor
-            self.pkg.search(self.pkg.regex.pattern)
-            self.items = self.pkg.to_list(self.cols-1)[1:]
-            self.installed = set(i for i, r in enumerate(self.pkg.rows) if r.ins)
-
-        scr.timeout(100)        # getch-timeout is used for delayed resize
+            if self.query is None and self.owns is not None:
+                self.pkg.owns(self.owns)
+                self.all, self.filter, self.ranked, self.fuzzy = self.pkg.rows, None, None, None
+                self.refilter()
+            else:
+                self.load(self.query if self.query is not None else self.pkg.regex.pattern)
+
+        def newsearch(text):
+            if text is None: return
+            self.filtertext = ""
+            self.load(text)
+
+        navkeys = (curses.KEY_UP, curses.KEY_DOWN, curses.KEY_HOME, curses.KEY_END,
+                   curses.KEY_PPAGE, curses.KEY_NPAGE, curses.KEY_MOUSE)
+
+        def getevents(timeout):
+            """
+            wait for input, then also fetch everything else pending up to the
+            first non-navigation key. So bursts (key-repeat, scrollwheel) are
+            handled with a single frame. Returns list of (key, mouse-event).
+            """
+            events = []
+            scr.timeout(timeout)
+            keh = scr.getch()
+            while keh > -1:
+                try:    mous = curses.getmouse() if keh == curses.KEY_MOUSE else None
+                except curses.error: mous = None
+                events.append((keh, mous))
+                if keh not in navkeys: break
+                scr.timeout(0)
+                keh = scr.getch()
+            return events
+
+        def render():
+            t = time.perf_counter()
+            self.display()
+            self.lastframe = time.perf_counter()
+            took = self.lastframe - t
+            self.frametime = took if self.frametime is None else .8 * self.frametime + .2 * took
+            self.jumpscroll = self.frametime > Style.jump_scroll
+
+        scr.refresh()           # let curses clear the screen now, not on first getch()
+        self.screen = None
         result, loop = None, True
-        repaint = True
+        dirty = True            # a new frame is needed
         doresize = False
-        fr, tr = self.display()
         while loop:
-            keh = scr.getch()
-            match keh:
-                case curses.KEY_RESIZE: doresize = True                         # 410
-                case -1:
-                    if doresize:
-                        self.rows, self.cols = scr.getmaxyx()
-                        lines = self.pkg.to_list(self.cols-1)
-                        self.header = lines[0][0]
-                        self.items = lines[1:]
-                        doresize = False
-                        repaint = True
-
-                # Navigation
-                case curses.KEY_UP:     self.cursor -= 1                        # 259
-                case curses.KEY_DOWN:   self.cursor += 1                        # 258
-                case curses.KEY_HOME:   self.cursor = 0                         # 262
-                case curses.KEY_END:    self.cursor = len(self.items) - 1       # 360
-                case curses.KEY_PPAGE:  self.offset, self.cursor = 0, fr        # 339
-                case curses.KEY_NPAGE:  self.offset, self.cursor = 2**63, tr    # 338
-
-                # jump to char
-                case x if 'a' <= chr(x).lower() <= 'z':                         # 97-122
-                    new = self.findfirst(chr(x))
-                    if new is not None: self.cursor = new
-
-                # MOUSE! scrollwheel scrolls. leftclick sets cursor. rightclick (de)selects
-                case curses.KEY_MOUSE:
-                    mous = curses.getmouse()    # (id, x, y, z, bstate)
-                    if mous[2] < 1 or mous[2] >= self.rows-1 or mous[2]-1 >= len(self.ymap) : continue
-                    if mous[4] == curses.BUTTON5_PRESSED: self.offset += 3
-                    if mous[4] == curses.BUTTON4_PRESSED: self.offset -= 3
-                    if mous[4] == curses.BUTTON3_CLICKED: toggle(self.ymap[mous[2]-1])
-                    if mous[4] == curses.BUTTON1_CLICKED: self.cursor = self.ymap[mous[2]-1]
-
-                # Hotkeys
-                case curses.KEY_F1:     showinfo(self.pkg.info)                 # 265
-                case curses.KEY_F2:     showinfo(self.pkg.filelist)             # 266
-                case curses.KEY_F5:     result, loop = updateDB, False          # 269
-                case 10:                result, loop = self.cursor, False       # return
-                case 32:                toggle(self.cursor); self.cursor += 1   # space
-                case 27 | curses.KEY_F10: result, loop = None, False            # escape
-
-            if keh > -1 or repaint:
-                fr, tr = self.display()
-                repaint = False
+            if self.poll(): dirty = True
+            if self.nothing: break
+            # getch-timeout is used for delayed resize and adding search results
+            timeout = 50 if self.loader is not None else 100
+            if dirty:
+                wait = self.lastframe + 1 / Style.max_fps - time.perf_counter()
+                if wait > 0:    # too early for a new frame, collect more input
+                    timeout = max(1, int(wait * 1000))
+                else:
+                    render()
+                    dirty = False
+
+            events = getevents(timeout)
+            if not events:
+                if not dirty and Style.prefetch and self.prefetched != self.cursor:
+                    # idle: fetch info/files of the rows around the cursor
+                    self.prefetched = self.cursor
+                    near = range(max(0, self.cursor - Style.prefetch),
+                                 min(len(self.items), self.cursor + Style.prefetch + 1))
+                    self.pkg.prefetch(self.pkg.rows[i].pkg for i in sorted(near, key=lambda i: abs(i - self.cursor)))
+                if doresize:
+                    self.rows, self.cols = scr.getmaxyx()
+                    self.items = self.pkg.lines(self.cols-1)
+                    self.header = self.items.header
+                    self.cursor = self.cursor   # keep cursor in view
+                    self.screen = None
+                    doresize = False
+                    dirty = True
+                continue
+
+            dcur, doff = 0, 0   # cursor- and scroll-movement, folded
+            for keh, mous in events:
+                if keh == curses.KEY_UP:   dcur -= 1; continue
+                if keh == curses.KEY_DOWN: dcur += 1; continue
+                if keh == curses.KEY_MOUSE and mous and self.itemat(mous[2]) is not None:
+                    if mous[4] == curses.BUTTON5_PRESSED: doff += 3; continue
+                    if mous[4] == curses.BUTTON4_PRESSED: doff -= 3; continue
+                if dcur: self.cursor += dcur
+                if doff: self.offset += doff
+                dcur, doff = 0, 0
+                self.follow = None  # user moved on
+
+                if self.prompt is not None:
+                    _, text, done, changed = self.prompt
+                    match keh:
+                        case 10:    self.prompt = None; done(text)
+                        case 27:    self.prompt = None; done(None)
+                        case curses.KEY_BACKSPACE | 127 | 8: text = text[:-1]
+                        case x if 32 <= x < 127: text += chr(x)
+                    if self.prompt is not None and text != self.prompt[1]:
+                        self.prompt[1] = text
+                        if changed: changed(text)
+                    continue
+
+                match keh:
+                    case curses.KEY_RESIZE: doresize = True                     # 410
+
+                    # Navigation
+                    case curses.KEY_HOME:   self.cursor = 0                     # 262
+                    case curses.KEY_END:    self.cursor = len(self.items) - 1   # 360
+                    case curses.KEY_PPAGE:                                      # 339
+                        self.offset, self.cursor = 0, self.visible()[0]
+                    case curses.KEY_NPAGE:                                      # 338
+                        self.offset, self.cursor = 2**63, self.visible()[1]
+
+                    # jump to char
+                    case x if 'a' <= chr(x).lower() <= 'z':                     # 97-122
+                        new = self.findfirst(chr(x))
+                        if new is not None: self.cursor = new
+
+                    # MOUSE! leftclick sets cursor. rightclick (de)selects
+                    case curses.KEY_MOUSE:
+                        item = self.itemat(mous[2]) if mous else None   # (id, x, y, z, bstate)
+                        if item is None: continue
+                        if mous[4] == curses.BUTTON3_CLICKED: toggle(item)
+                        if mous[4] == curses.BUTTON1_CLICKED: self.cursor = item
+
+                    # Hotkeys
+                    case x if x in (10, 32, curses.KEY_F1, curses.KEY_F2) and not len(self.items):
+                        pass    # nothing to show or select
+                    case curses.KEY_F1:     showinfo(self.pkg.info)             # 265
+                    case curses.KEY_F2:     showinfo(self.pkg.filelist)         # 266
+                    case 47:    # "/": filter while typing, Esc removes the filter
+                        self.prompt = ["Filter", self.filtertext, lambda t: t is None and self.refilter(""), self.refilter]
+                    case curses.KEY_F3 if self.query is not None and not self.pkg.queries:
+                        self.pkg.fuzzy = not self.pkg.fuzzy     # same search, ranked or not
+                        self.load(self.query)
+                    case curses.KEY_F4:
+                        label = "Query" if self.pkg.queries else "Search"
+                        self.prompt = [label, self.query or "", newsearch, None]
+                    case curses.KEY_F5:     result, loop = updateDB, False      # 269
+                    case 10:                result, loop = self.cursor, False   # return
+                    case 32:                toggle(self.cursor); self.cursor += 1   # space
+                    case 27 if self.loader is not None: self.loader.cancel()   # stop search
+                    case 27 | curses.KEY_F10: result, loop = None, False        # escape
+            if dcur: self.cursor += dcur
+            if doff: self.offset += doff
+            dirty = True
 
         curses.curs_set(1)
         return result
@@ -1061,7 +3651,8 @@ class LineSelect():
 
     def main(self):
         # start loading all installed packages in the background for pkg.info()
-        threading.Thread(target=pkg._get_installed).start()
+        import curses
+        self.pkg.installed()
         curses.set_escdelay(50)
 
         def header(s, c):
@@ -1070,31 +3661,39 @@ class LineSelect():
 
         while True:
             res = curses.wrapper(self.mainloop)
+            if not callable(res):   # no more searching and prefetching
+                if self.loader is not None: self.loader.cancel()
+                self.pkg.shutdown()
             if callable(res):
                 header(res.__name__, 0)
                 res()
 
             elif res is not None:
-                if len(self.selected) == 0: self.selected = set([res])
-                pkgwech = self.selected.intersection(self.installed)
+                if len(self.selected) == 0: self.selected = {self.key(res): bool(self.pkg.rows[res].ins)}
+                shown = {(r.db, r.pkg): i for i, r in enumerate(self.pkg.rows)}
+                def show(keys):  # selected rows may be gone after a new search
+                    print("\n".join("\n".join(self.items[shown[k]]) if k in shown else k[1] for k in keys))
+                    print()
+
+                pkgwech = [k for k, ins in self.selected.items() if ins]
                 if pkgwech:
                     header("REMOVE", 1)
-                    print("\n".join("\n".join(self.items[s]) for s in pkgwech))
-                    print()
+                    show(pkgwech)
 
-                pkghin = self.selected.difference(self.installed)
+                pkghin = [k for k, ins in self.selected.items() if not ins]
                 if pkghin:
                     header("INSTALL", 0)
-                    print("\n".join("\n".join(self.items[s]) for s in pkghin))
-                    print()
+                    show(pkghin)
 
-                if pkgwech: self.pkg.uninstall([self.pkg.rows[s].pkg for s in pkgwech])
-                if pkghin:  self.pkg.install([self.pkg.rows[s].pkg for s in pkghin])
+                if pkgwech: self.pkg.uninstall([k[1] for k in pkgwech])
+                if pkghin:  self.pkg.install([k[1] for k in pkghin])
                 break
             else:
+                if self.nothing: return False
                 if not self.doscrollbar:
                     self.pkg.to_ansi(self.cols-1)
                 break
+        return True
 
 
 #┌─────────────────────────────────────────────────────────────────────────────┐
@@ -1119,7 +3718,36 @@ if __name__ == '__main__':
 
         Other output options are available and mutually exclusive.
     """)
-    parser.add_argument("searchterm", type=str, nargs=1, help="regex to search for")
+    parser.add_argument("searchterm", type=str, nargs="?", help="regex to search for")
+    kind = parser.add_mutually_exclusive_group()
+    kind.add_argument("-o", "--owns", action="store_true", help="""
+        searchterm is a path or glob (e.g. /usr/bin/ls or *.desktop): list
+        packages owning matching files. Wildcards don't match "/". Can be
+        combined with other options.
+    """)
+    kind.add_argument("-q", "--query", action="store_true", help="""
+        searchterm is a query like `name:^python repo:extra installed`:
+        name:, desc:, repo:, group: (regexes), installed, outdated, combined
+        with AND (or a space), OR, NOT and parentheses.
+    """)
+    kind.add_argument("-f", "--fuzzy", action="store_true", help="""
+        rank packages by a fuzzy match of searchterm (its characters in this
+        order), like fzf. Only the best matches are shown.
+    """)
+    parser.add_argument("-u", "--outdated", action="store_true", help="""
+        only list installed packages with a newer version available. The
+        searchterm is optional here. Can be combined with -q or -f.
+    """)
+    parser.add_argument("--timings", action="store_const", const="table", help="""
+        print time spent and number of calls per stage (running programs,
+        searching, formatting, ...) to stderr when done. Same as setting
+        PMS_TIMINGS=table, PMS_TIMINGS=json prints them as JSON.
+    """)
+    parser.add_argument("--daemon", action="store_true", help="""
+        keep the package databases in memory and answer searches of other
+        calls (except interactive ones) on a unix socket, until interrupted.
+        They will use it on their own.
+    """)
     group = parser.add_mutually_exclusive_group()
 
     group.add_argument("-j", "--json", action="store_true", help="""
@@ -1138,33 +3766,61 @@ if __name__ == '__main__':
         Searchterm must be the exact packagename (or yield exactly one result)
     """)
     args = parser.parse_args()
+    if args.outdated and args.owns: parser.error("argument -u/--outdated: not allowed with argument -o/--owns")
+    if args.searchterm is None:
+        if not (args.outdated or args.daemon): parser.error("the following arguments are required: searchterm")
+        args.searchterm = "."
+    try:    # bad searchterms are reported like bad arguments, not with a traceback
+        if args.query: Query(args.searchterm)
+        elif not (args.owns or args.fuzzy or args.daemon): re.compile(args.searchterm)
+    except (ValueError, re.error) as e:
+        parser.error(f"argument searchterm: {e}")
+    timings = args.timings or os.environ.get("PMS_TIMINGS")
+    if timings:
+        import atexit
+        Timer.enabled = True
+        atexit.register(Timer.report, "json" if timings == "json" else "table")
 
     # Use better colors, if available and detect terminal size
     w, h, tty = 80, 25, (sys.stdout.isatty() and sys.stdin.isatty())
     if tty:
+        import curses
         curses.setupterm()
         if curses.tigetnum("colors") > 16: Style = Style256
         ts = os.get_terminal_size()
         w, h = ts.columns, ts.lines
 
+    # A running daemon has everything at hand already
+    interactive = tty and not (args.json or args.csv or args.info or args.ansi is not None)
+    pkg = None if interactive or args.daemon else RemotePkg.connect()
+
     # Try Autodetecting PACKAGE MANAGER                      │
-    PkgMgr = None
-    if checkcmd("apt") and not checkcmd("pacman"): PkgMgr = AptPkg
-    if checkcmd("pacman") and not checkcmd("apt"): PkgMgr = PacPkg
-    assert PkgMgr is not None, "Could not detect packagemanager"
-    
-    pkg = PkgMgr()
-    pkg.search(args.searchterm[0])
-    if len(pkg.rows) == 0: sys.exit(1)  # nothing found
+    if pkg is None:
+        PkgMgr = {"apt": AptPkg, "pacman": PacPkg}.get(pkgmanager())
+        assert PkgMgr is not None, "Could not detect packagemanager"
+        pkg = PkgMgr()
+    if args.daemon:
+        Daemon(pkg).serve()
+        sys.exit()
+    pkg.queries, pkg.fuzzy, pkg.upgrades = args.query, args.fuzzy, args.outdated
+    if args.owns:
+        pkg.owns(args.searchterm)
+    elif interactive:   # results are shown while they arrive
+        pkg._compile(args.searchterm)
+    else:
+        pkg.search(args.searchterm)
+    if pkg.rows is not None and len(pkg.rows) == 0: sys.exit(1)  # nothing found
 
     if args.json: pkg.to_json()
     elif args.csv: pkg.to_csv()
     elif args.info:
-        if len(pkg.rows) > 1:
-            pkg.rows = [x for x in pkg.rows if x.pkg==args.searchterm[0]]
+        if args.fuzzy: pkg.rows = pkg.rows[:1]    # the best match
+        elif len(pkg.rows) > 1 and not (args.owns or args.query):
+            pkg.rows = [x for x in pkg.rows if x.pkg==args.searchterm]
         if len(pkg.rows) != 1:
             print("Error: Package not found")
             sys.exit(1)
+        pkg.prefetch([pkg.rows[0].pkg])    # get info and files in parallel
         nfo = pkg.info(pkg.rows[0].pkg, w, h)
         lst = pkg.filelist(pkg.rows[0].pkg, w, max(h-len(nfo)-7, 1))
         print("\n"+"\n".join(nfo+["","\x1b[97;1mFiles:\x1b[m",""]+lst)+"\n")
@@ -1172,5 +3828,9 @@ if __name__ == '__main__':
         if args.ansi > 0: w = args.ansi
         pkg.to_ansi(w)
     else:
-        if tty: LineSelect(pkg).main()
+        if tty:
+            if args.owns: ls = LineSelect(pkg, owns=args.searchterm)
+            else: ls = LineSelect(pkg, args.searchterm)
+            if not ls.main(): sys.exit(1)   # nothing found
         else: pkg.to_csv()
+    sys.stdout.flush()  # output is complete, a TrigramIndex may still be built (see Pkg._candidates)
@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for pms.py. Run on a machine with pacman.
+
+usage: pms_bench.py [-h] [-n N] [-s SIZE] [--history FILE]
+                    {search,trigrams,format,installed,files,startup,apt,query,cli,tui} [term ...]
+
+`apt`, `query`, `cli` and `tui` run on synthetic databases with stand-ins for
+pacman and pkgfile, so they work anywhere. The results of `cli` are added to a JSON
+history file and compared with the previous run there. `tui` replays SCRIPT
+in a pseudo-terminal.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import threading
+
+import pms
+
+# startup: seconds `import pms` may add to the interpreter's startup, and
+# modules it must not import (they are imported lazily, where needed).
+BUDGET = 0.05
+LAZY = ("curses", "json", "asyncio", "concurrent.futures")
+
+# cli: package-counts of the synthetic databases and output modes to run.
+SIZES = (1000, 15000, 100000)
+MODES = {"csv": ["-c"], "json": ["-j"], "ansi": ["-a", "120"], "info": ["-i"]}
+WORDS = ("lib python perl rust gtk qt kde gnome tool util data font theme icon "
+         "server client daemon audio video image net web shell x11 wayland").split()
+GROUPS = ["", "", "", "", "base-devel", "kde-applications kde-utilities", "gnome", "xorg"]
+REPOS = ("core", "extra", "extra", "extra", "multilib")
+
+# query: queries (-q) and the options giving the same rows
+QUERIES = {"outdated": ["-u"]}
+
+# tui: terminal-size and the steps replayed in it: (name, keys), steps with
+# the same name are summarized. keys are sent at once (like key-repeat):
+# terminfo-capabilities, "esc", "wheelup"/"wheeldown" or "<cols>x<rows>"
+# for resizing the terminal.
+TTY = (120, 30)
+SCRIPT = ([("pgdn", ["knp"])] * 5 + [("pgdn x10", ["knp"] * 10)] * 3 + [("down x20", ["kcud1"] * 20)] * 3
+          + [("end", ["kend"]), ("wheel up x10", ["wheelup"] * 10), ("home", ["khome"])]
+          + [("wheel down", ["wheeldown"])] * 5 + [("resize", ["100x40"]), ("resize", ["120x30"])]
+          + [("f1 info", ["kf1"]), ("close info", ["esc"]), ("f2 files", ["kf2"]), ("close info", ["esc"])] * 3)
+QUIET = 0.25            # a step is done when there was no output for this long (seconds)
+PATIENCE = 5            # ... or none at all for this long
+FRAMEGAP = 0.004        # output with a pause this long in between are two frames
+
+
+def timeit(fun, n=1):
+    """call fun() n times, return (best time in seconds, last result)"""
+    best, res = float("inf"), None
+    for _ in range(n):
+        t = time.perf_counter()
+        res = fun()
+        best = min(best, time.perf_counter() - t)
+    return best, res
+
+
+def report(name, secs, ref=None):
+    rel = f"  ({ref / secs:6.1f}x)" if ref else ""
+    print(f"  {name:<24} {secs * 1000:9.2f} ms{rel}")
+
+
+#┌─────────────────────────────────────────────────────────────────────────────┐
+#│                                  FIXTURES                                   │
+#└─────────────────────────────────────────────────────────────────────────────┘
+def fixture(n, seed=1):
+    """
+    Make synthetic pacman-databases with n packages (and return their
+    directory): db/sync/*.{db,files}, db/local, pacman.conf, the same as
+    apt-lists and dpkg-status (apt/), the packages for the stand-ins
+    (local.jsonl, sync.jsonl: name, tab, JSON per line) and bin/ with
+    stand-ins for pacman and pkgfile. They are made once per n and seed,
+    sync.jsonl is written last.
+    """
+    import io, shutil, tarfile
+    root = pms.cachefile(f"bench/{n}-{seed}")
+    if all(os.path.exists(os.path.join(root, f)) for f in ("apt/status", "sync.jsonl")): return root
+    shutil.rmtree(root, ignore_errors=True)
+    rnd = random.Random(seed)
+    def ver():
+        v = ".".join(str(rnd.randint(0, 20)) for _ in range(rnd.randint(1, 3)))
+        if rnd.random() < .05: v = f"{rnd.randint(1, 3)}:{v}"
+        return f"{v}-{rnd.randint(1, 4)}"
+    def package(name, repo):
+        deps = [d + rnd.choice(["", ">=0.1"]) for d in rnd.sample(names, min(len(names), rnd.randint(0, 3)))]
+        return dict(repo=repo, name=name, ver=ver(), grps=rnd.choice(GROUPS).split(), deps=deps,
+                    desc=" ".join(rnd.choice(WORDS + ["the", "a", "for", "with", "and"])
+                                  for _ in range(rnd.randint(3, 25))),
+                    prov=[f"{rnd.choice(WORDS)}-prov{len(names)}=1.0"] if rnd.random() < .1 else [],
+                    files=["usr/", "usr/bin/", f"usr/bin/{name}", "usr/share/", f"usr/share/{name}/",
+                           f"usr/share/{name}/data{len(names) % 7}.txt"])
+    def desc(p):
+        fields = [("FILENAME", [f"{p['name']}-{p['ver']}-x86_64.pkg.tar.zst"]), ("NAME", [p["name"]]),
+                  ("VERSION", [p["ver"]]), ("DESC", [p["desc"]]), ("GROUPS", p["grps"]),
+                  ("CSIZE", ["1234"]), ("ISIZE", ["5678"]), ("ARCH", ["x86_64"]), ("LICENSE", ["GPL"]),
+                  ("PROVIDES", p["prov"]), ("DEPENDS", p["deps"])]
+        return "".join(f"%{k}%\n" + "\n".join(v) + "\n\n" for k, v in fields if v)
+    names, sync = [], []
+    for i in range(n):
+        name = "-".join(rnd.sample(WORDS, rnd.randint(1, 3))) + str(i)
+        sync.append(package(name, rnd.choice(REPOS)))
+        names.append(name)
+    # installed: 30%, some in another version, plus foreign ones
+    local = [dict(p, ver=ver() if rnd.random() < .2 else p["ver"]) for p in sync if rnd.random() < .3]
+    local += [dict(package(f"foreign-{rnd.choice(WORDS)}{i}", ""), deps=[]) for i in range(max(3, n // 100))]
+    # one is newer than in its repository (e.g. built locally), so not outdated
+    local[0] = dict(local[0], ver="9:" + local[0]["ver"].split(":")[-1])
+    for repo in sorted(set(REPOS)):
+        for kind in ("db", "files"):
+            os.makedirs(os.path.join(root, "db", "sync"), exist_ok=True)
+            with tarfile.open(os.path.join(root, "db", "sync", f"{repo}.{kind}"), "w:gz") as t:
+                def add(path, text=None):
+                    ti = tarfile.TarInfo(path)
+                    if text is None: ti.type = tarfile.DIRTYPE; t.addfile(ti); return
+                    data = text.encode()
+                    ti.size = len(data)
+                    t.addfile(ti, io.BytesIO(data))
+                for p in sync:
+                    if p["repo"] != repo: continue
+                    d = f"{p['name']}-{p['ver']}"
+                    add(d)
+                    add(d + "/desc", desc(p))
+                    if kind == "files": add(d + "/files", "%FILES%\n" + "\n".join(p["files"]) + "\n")
+    for p in local:
+        d = os.path.join(root, "db", "local", f"{p['name']}-{p['ver']}")
+        os.makedirs(d)
+        with open(os.path.join(d, "desc"), "w") as f: f.write(desc(p))
+        with open(os.path.join(d, "files"), "w") as f: f.write("%FILES%\n" + "\n".join(p["files"]) + "\n\n")
+    with open(os.path.join(root, "db", "local", "ALPM_DB_VERSION"), "w") as f: f.write("9\n")
+    with open(os.path.join(root, "pacman.conf"), "w") as f:
+        f.write(f"[options]\nDBPath = {os.path.join(root, 'db')}/\n\n"
+                + "".join(f"[{r}]\nInclude = /etc/pacman.d/mirrorlist\n\n" for r in sorted(set(REPOS))))
+    os.makedirs(os.path.join(root, "apt", "lists"))
+    for repo in sorted(set(REPOS)):
+        with open(os.path.join(root, "apt", "lists", f"fixture_dists_stable_{repo}_binary-amd64_Packages"), "w") as f:
+            f.writelines(f"Package: {p['name']}\nVersion: {p['ver']}\nSection: {(p['grps'] or ['misc'])[0]}\n"
+                         f"Description: {p['desc']}\n\n" for p in sync if p["repo"] == repo)
+    with open(os.path.join(root, "apt", "status"), "w") as f:
+        f.writelines(f"Package: {p['name']}\nStatus: install ok installed\nArchitecture: amd64\n"
+                     f"Version: {p['ver']}\nSection: misc\nDescription: {p['desc']}\n\n" for p in local)
+    # pms must detect pacman, so a real apt is shadowed by one that's not working
+    os.makedirs(os.path.join(root, "bin"))
+    here = os.path.dirname(os.path.abspath(__file__))
+    for prog in ("pacman", "pkgfile", "apt"):
+        path = os.path.join(root, "bin", prog)
+        with open(path, "w") as f:
+            f.write(f"#!{sys.executable}\nimport sys; sys.exit(1)\n" if prog == "apt" else
+                    f"#!{sys.executable}\nimport sys; sys.path.insert(0, {here!r})\n"
+                    f"import pms_bench; pms_bench.standin({root!r}, {prog!r}, sys.argv[1:])\n")
+        os.chmod(path, 0o755)
+    for kind, pkgs in (("local", local), ("sync", sync)):
+        with open(os.path.join(root, kind + ".jsonl"), "w") as f:
+            f.writelines(f"{p['name']}\t{json.dumps(p)}\n" for p in pkgs)
+    return root
+
+
+def fixture_env(root, **extra):
+    """environment for running pms.py on the fixture in root (plus extra)"""
+    env = dict(os.environ, PATH=os.path.join(root, "bin") + os.pathsep + os.environ.get("PATH", ""),
+               XDG_CACHE_HOME=os.path.join(root, "cache"), PMS_PACMAN_CONF=os.path.join(root, "pacman.conf"))
+    env.pop("PMS_TIMINGS", None)
+    env.update(extra)
+    return env
+
+
+def standin(root, prog, argv):
+    """
+    `pacman` or `pkgfile` for the databases in root (see fixture()),
+    answering the queries pms.py makes with their output-format. Only the
+    packages needed are parsed, like a lookup in pacman's databases.
+    """
+    def load(kind, name=None):
+        with open(os.path.join(root, kind + ".jsonl")) as f:
+            lines = (l.split("\t", 1) for l in f)
+            return {n: json.loads(p) for n, p in lines if name is None or n == name}
+    op, arg = (argv + [None, None])[:2]
+    def fail(msg=None):
+        if msg: print(f"error: {msg}", file=sys.stderr)
+        sys.exit(1)
+    def info(p, repo=False):
+        fields = [("Repository", p["repo"] if repo else None), ("Name", p["name"]), ("Version", p["ver"]),
+                  ("Description", p["desc"]), ("Architecture", "x86_64"), ("URL", "https://example.org"),
+                  ("Licenses", "GPL"), ("Groups", "  ".join(p["grps"]) or "None"),
+                  ("Provides", "  ".join(p["prov"]) or "None"), ("Depends On", "  ".join(p["deps"]) or "None"),
+                  ("Optional Deps", "None"), ("Required By", None if repo else "None"),
+                  ("Conflicts With", "None"), ("Replaces", "None"), ("Installed Size", "5.54 KiB")]
+        return "".join(f"{k:<15} : {v}\n" for k, v in fields if v is not None) + "\n"
+    def files(p): return [f"/{f}" for f in p["files"]]
+    if prog == "pkgfile":
+        found = load("sync", arg).values() if op == "-lq" else []
+        if op == "-V": print("pkgfile v21")
+        elif found: print("\n".join(f for p in found for f in files(p)))
+        else: fail()
+    elif op in (None, "-h"):
+        print("usage:  pacman <operation> [...]")
+    elif op == "-Ss":
+        rx, local = re.compile(arg or ".", re.IGNORECASE), load("local")
+        out = []
+        for p in load("sync").values():
+            if not (rx.search(p["name"]) or rx.search(p["desc"]) or
+                    any(rx.search(v.split("=", 1)[0]) for v in p["prov"])): continue   # like libalpm
+            l = f"{p['repo']}/{p['name']} {p['ver']}" + (f" ({' '.join(p['grps'])})" if p["grps"] else "")
+            if p["name"] in local:
+                v = local[p["name"]]["ver"]
+                l += " [installed]" if v == p["ver"] else f" [installed: {v}]"
+            out += [l, "    " + p["desc"]]
+        if not out: fail()
+        print("\n".join(out))
+    elif op == "-Q":
+        print("\n".join(f"{p['name']} {p['ver']}" for p in load("local").values()))
+    elif op in ("-Qi", "-Qmi"):
+        sync = load("sync") if op == "-Qmi" else {}
+        found = [p for p in load("local", arg).values() if p["name"] not in sync]
+        if arg and not found: fail(f"package '{arg}' was not found")
+        sys.stdout.write("".join(map(info, found)))
+    elif op == "-Sii":
+        found = load("sync", arg)
+        if not found: fail(f"package '{arg}' was not found")
+        sys.stdout.write(info(found[arg], True))
+    elif op == "-Qu":
+        sync = load("sync")
+        out = [f"{n} {p['ver']} -> {sync[n]['ver']}" for n, p in load("local").items()
+               if n in sync and pms.vercmp(sync[n]["ver"], p["ver"]) > 0]
+        if not out: fail()
+        print("\n".join(out))
+    elif op in ("-Qlq", "-Flq"):
+        p = load("local" if op == "-Qlq" else "sync", arg).get(arg)
+        if p is None: fail(f"package '{arg}' was not found")
+        print("\n".join(files(p) if op == "-Qlq" else p["files"]))
+    elif op in ("-Qoq", "-Fq", "-F"):
+        found = [p for p in load("local" if op == "-Qoq" else "sync").values() if arg.lstrip("/") in p["files"]]
+        if not found: fail()
+        print("\n".join(p["name"] if op == "-Qoq" else f"{p['repo']}/{p['name']}" if op == "-Fq" else
+                        f"{arg.lstrip('/')} is owned by {p['repo']}/{p['name']} {p['ver']}" for p in found))
+    else:
+        fail(f"{op} is not supported here")
+
+
+#┌─────────────────────────────────────────────────────────────────────────────┐
+#│                                 BENCHMARKS                                  │
+#└─────────────────────────────────────────────────────────────────────────────┘
+def bench_search(args):
+    """native sync-database reader vs. `pacman -Ss`"""
+    pkg = pms.PacPkg()
+    for term in args.term or [".", "python", "^lib", "kde|gnome"]:
+        pkg.regex = re.compile(term, re.IGNORECASE)
+        print(f"»{term}«")
+        def parse():
+            pms.PacPkg.SyncTable = None
+            if os.path.exists(pms.cachefile("sync")): os.remove(pms.cachefile("sync"))
+            return pkg._search_sync()
+        def cached():
+            pms.PacPkg.SyncTable = None
+            return pkg._search_sync()
+        tp, native = timeit(parse, args.n)
+        tc, _ = timeit(cached, args.n)
+        tw, _ = timeit(pkg._search_sync, args.n)
+        ts, spawned = timeit(pkg._search_pacman, args.n)
+        report("pacman -Ss", ts)
+        report("native (no cache)", tp, ts)
+        report("native (cache-file)", tc, ts)
+        report("native (in memory)", tw, ts)
+        same = sorted(native) == sorted(spawned)
+        print(f"  {len(native)} rows, {'identical' if same else 'DIFFERENT'} results")
+        if not same: sys.exit(1)
+
+
+def bench_trigrams(args):
+    """trigram-index vs. regex on every row, for selective and non-selective patterns"""
+    pkg = pms.PacPkg()
+    table = pkg._read_sync()
+    if table is None: sys.exit("can't read sync-databases")
+    pkg._local_versions()
+    pkg.regex = re.compile("python", re.IGNORECASE)
+    def build():
+        pms.Pkg._indexes.clear()
+        if os.path.exists(pms.cachefile("sync.tri")): os.remove(pms.cachefile("sync.tri"))
+        return pkg._build_index("sync.tri", pms.PacPkg.SyncKey,
+            lambda: zip(table.name, table.desc, table.grps, table.prov))
+    def load():
+        pms.Pkg._indexes.clear()
+        return pkg._candidates("sync.tri", pms.PacPkg.SyncKey, None)
+    def first():    # falls back to every row, the index is built meanwhile
+        pms.Pkg._indexes.clear()
+        os.remove(pms.cachefile("sync.tri"))
+        return pkg._search_sync()
+    tb, _ = timeit(build, 1)
+    tf, _ = timeit(first, 1)
+    for t in threading.enumerate():
+        if not t.daemon and t is not threading.current_thread(): t.join()
+    tl, _ = timeit(load, args.n)
+    report("build index", tb)
+    report("first search", tf)
+    report("load index", tl)
+    # selective: names of a few packages; non-selective: common words, no literals
+    names = table.name[::max(1, len(table.name) // 3)][:3]
+    for term in args.term or names + ["lib", "python|perl", ".", "^[a-z]+$"]:
+        pkg.regex = re.compile(term, re.IGNORECASE)
+        print(f"»{term}«")
+        def search(trigrams):
+            pms.Pkg.trigrams = trigrams
+            return pkg._search_sync()
+        ts, a = timeit(lambda: search(False), args.n)
+        ti, b = timeit(lambda: search(True), args.n)
+        found = pkg._candidates("sync.tri", pms.PacPkg.SyncKey, None)
+        report("every row", ts)
+        report("trigram-index", ti, ts)
+        print(f"  {len(a)} rows, {'all' if found is None else len(found)} candidates, "
+              f"{'identical' if a == b else 'DIFFERENT'} results")
+        if a != b: sys.exit(1)
+
+
+def cellwise(pkg, width):
+    """
+    reference for bench_format: format every cell on its own with fg() and a
+    regex.sub() for the highlights, like pms.py did before the layout-plan.
+    """
+    lay, cols = pkg._layout(width), pkg.cols
+    def hl(s): return pkg.regex.sub(pms.hl("\\g<0>", pms.Style.highlight), s)
+    res = []
+    for r in pkg.rows:
+        desc = list(pms.wrap(r.desc, lay.descwidth))
+        grps = (r.grps.split() if lay.splitgrps else [r.grps]) if r.grps else [""]
+        rol = max(len(grps) if "grps" not in lay.rem else 1,
+                  2 if r.old and lay.splitver and "ver" not in lay.rem else 1, len(desc))
+        frow = []
+        if "db" not in lay.rem:
+            db = [pms.fg(f" {r.db:{cols.db}} ", pms.Style.db if r.db != pms.Style.ext_str else pms.Style.ext)]
+            frow.append(db + [" " * (cols.db + 2)] * (rol - 1))
+        if "grps" not in lay.rem:
+            grs = [pms.fg(hl(f" {g:{lay.grpswidth}} "), pms.Style.grps) for g in grps]
+            frow.append(grs + [" " * (lay.grpswidth + 2)] * (rol - len(grs)))
+        frow.append([pms.fg(hl(f" {r.pkg:{cols.pkg}} "), pms.Style.ins if r.ins else pms.Style.pkg)]
+                    + [" " * (cols.pkg + 2)] * (rol - 1))
+        if "ver" not in lay.rem:
+            ver = [pms.fg(f" {r.ver:{cols.ver}} ", pms.Style.ins if r.ins else pms.Style.ver)]
+            ver += [" " * (cols.ver + 2)] * (rol - 1)
+            if r.old and lay.splitver: ver[1] = pms.fg(f" {r.old:{cols.ver}} ", pms.Style.old)
+            elif r.old: ver[0] += "→" + pms.fg(f" {r.old:{cols.ver}} ", pms.Style.old)
+            elif not lay.splitver: ver[0] += f"  {'':{cols.ver}} "
+            frow.append(ver)
+        desc += [""] * (rol - len(desc))
+        frow.append([pms.fg(hl(f" {d:{lay.descwidth}}"), pms.Style.desc) for d in desc])
+        res.append(["".join(c[i] for c in frow) for i in range(rol)])
+    return res
+
+
+def bench_format(args):
+    """layout-plan (to_list) vs. formatting every cell on its own"""
+    pkg = pms.PacPkg()
+    if pkg._read_sync() is None: sys.exit("can't read sync-databases")
+    noansi = re.compile("\033\\[[0-9;]*m")
+    for term in args.term or [".", "lib", "python"]:
+        pkg.search(term)
+        print(f"»{term}« {len(pkg.rows)} rows")
+        if not pkg.rows: continue
+        for width in (80, 120, 200):
+            pkg._layouts.clear()
+            def cold():
+                pkg._layouts.clear()
+                pkg._spancache = None, None, {}
+                return pkg.to_list(width)[1:]   # without header
+            tr, ref = timeit(lambda: cellwise(pkg, width), args.n)
+            tc, res = timeit(cold, args.n)
+            tw, _ = timeit(lambda: pkg.to_list(width), args.n)
+            print(f" width {width}")
+            report("every cell", tr)
+            report("layout-plan", tc, tr)
+            report("layout-plan (spans)", tw, tr)
+            same = [[noansi.sub("", l) for l in r] for r in ref] == [[noansi.sub("", l) for l in r] for r in res]
+            if not same:
+                print("  DIFFERENT results")
+                sys.exit(1)
+
+
+def bench_installed(args):
+    """local-database reader vs. `pacman -Q` + `pacman -Qi`"""
+    pkg = pms.PacPkg()
+    def native():
+        pkg.Installed = {}
+        pkg._get_installed()
+        return pkg.Installed
+    def spawned():
+        pkg.Installed = {}
+        pkg._get_installed_pacman()
+        return pkg.Installed
+    tn, a = timeit(native, args.n)
+    ts, b = timeit(spawned, args.n)
+    report("pacman -Q/-Qi", ts)
+    report("native", tn, ts)
+    print(f"  {len(a)} entries, {'identical' if a == b else 'DIFFERENT'} results")
+    if a != b: sys.exit(1)
+
+
+def bench_files(args):
+    """file-index vs. `pacman -Qlq`/`-Flq` and `pacman -F`"""
+    pkg = pms.PacPkg()
+    def build():
+        pms.PacPkg.FileTable = None
+        if os.path.exists(pms.cachefile("files")): os.remove(pms.cachefile("files"))
+        return pkg._read_files()
+    def load():
+        pms.PacPkg.FileTable = None
+        return pkg._read_files()
+    tb, index = timeit(build, 1)
+    tl, _ = timeit(load, args.n)
+    report("build index", tb)
+    report("load index", tl)
+    if index is None: sys.exit("can't read files-databases")
+    for name in args.term or index.names[::max(1, len(index.names) // 3)][:3]:
+        print(f"»{name}«")
+        tn, a = timeit(lambda: index.files(name), args.n)
+        try:
+            ts, b = timeit(lambda: pms.cmd("pacman", ["-Qlq", name]), args.n)
+        except pms.subprocess.CalledProcessError:
+            ts, b = timeit(lambda: pms.cmd("pacman", ["-Flq", name]), args.n)
+        report("pacman -Qlq/-Flq", ts)
+        report("file-index", tn, ts)
+        same = sorted(a) == sorted("/" + f.lstrip("/") for f in b)    # -Flq omits the "/"
+        print(f"  {len(a)} files, {'identical' if same else 'DIFFERENT'} results")
+        path = next((f for f in a if not f.endswith("/")), None)
+        if path is None: continue
+        tn, _ = timeit(lambda: index.owners(path), args.n)
+        ts, _ = timeit(lambda: pms.cmd("pacman", ["-F", path]), args.n)
+        report("pacman -F", ts)
+        report("file-index (owner)", tn, ts)
+
+
+def bench_startup(args):
+    """import time of pms.py, `pms.py -h` and a search, checked against BUDGET and LAZY"""
+    here = os.path.dirname(os.path.abspath(pms.__file__))
+    env = fixture_env(fixture(SIZES[0]))
+    def python(*a): return subprocess.run([sys.executable, *a], cwd=here, env=env, check=True,
+                                          capture_output=True, text=True).stdout
+    python("-c", "import pms")     # compile to __pycache__ first
+    tp, _ = timeit(lambda: python("-c", "pass"), args.n)
+    ti, _ = timeit(lambda: python("-c", "import pms"), args.n)
+    th, _ = timeit(lambda: python("pms.py", "-h"), args.n)
+    report("python", tp)
+    report("import pms", ti - tp)
+    report("pms.py -h", th - tp)
+    # with backend detection (its result is cached, see pms.pkgmanager)
+    python("-c", "import pms; pms.pkgmanager()")
+    loaded = python("-c", f"import sys, pms; pms.pkgmanager(); print(*(m for m in {LAZY!r} if m in sys.modules))").split()
+    print(f"  budget {BUDGET * 1000:.0f} ms, {'imported: ' + ', '.join(loaded) if loaded else 'no eager imports'}")
+    # a real run, with cache-files: json is only needed for their headers
+    def search(): return subprocess.run([sys.executable, "-X", "importtime", "pms.py", "-c", "python"], cwd=here,
+                                         env=env, check=True, capture_output=True, text=True).stderr
+    search()    # write cache-files
+    tc, out = timeit(search, args.n)
+    report("pms.py -c python", tc - tp)
+    used = {l.rsplit("|", 1)[-1].strip() for l in out.splitlines()}
+    loaded += [m for m in LAZY if m in used and m != "json"]
+    print(f"  {'imported: ' + ', '.join(loaded) if loaded else 'no eager imports'} (pms.py -c)")
+    if ti - tp > BUDGET or loaded: sys.exit(1)
+
+
+def bench_apt(args):
+    """apt's snapshot-table, on synthetic lists and status (checked against the packages they were made of)"""
+    for n in args.size or SIZES[:2]:
+        root = fixture(n)
+        os.environ["XDG_CACHE_HOME"] = os.path.join(root, "cache")     # see cachefile()
+        pkg = pms.AptPkg()
+        pkg.lists, pkg.status = os.path.join(root, "apt", "lists"), os.path.join(root, "apt", "status")
+        def parse():
+            pms.AptPkg.SnapTable = None
+            if os.path.exists(pms.cachefile("apt")): os.remove(pms.cachefile("apt"))
+            return pkg._read_snapshot()
+        def cached():
+            pms.AptPkg.SnapTable = None
+            return pkg._read_snapshot()
+        tp, table = timeit(parse, args.n)
+        tc, _ = timeit(cached, args.n)
+        print(f"{n} packages")
+        report("no cache", tp)
+        report("cache-file", tc, tp)
+        # candidate: the newest version, installed or available (apt never downgrades)
+        packages = {}
+        for kind in ("sync", "local"):
+            with open(os.path.join(root, kind + ".jsonl")) as f:
+                for l in f:
+                    p = json.loads(l.split("\t", 1)[1])
+                    inst, cand = packages.get(p["name"], ("", ""))
+                    if kind == "local": inst = p["ver"]
+                    if not cand or pms.debvercmp(p["ver"], cand) > 0: cand = p["ver"]
+                    packages[p["name"]] = inst, cand
+        got = {name: (inst, cand) for name, inst, cand in zip(table.name, table.inst, table.cand)}
+        newer = sum(c == "now" and not name.startswith("foreign-") for name, c in zip(table.name, table.comp))
+        print(f"  {len(got)} rows, {newer} installed newer than available, "
+              f"{'identical' if got == packages else 'DIFFERENT'} results")
+        if got != packages: sys.exit(1)
+
+
+def bench_query(args):
+    """queries vs. the options they stand for, on synthetic databases (results must be the same)"""
+    here = os.path.dirname(os.path.abspath(pms.__file__))
+    for n in args.size or SIZES[:2]:
+        env = fixture_env(fixture(n))
+        print(f"{n} packages")
+        for query, opts in QUERIES.items():
+            def run(*a):
+                p = subprocess.run([sys.executable, "pms.py", "-c", *a], cwd=here, env=env,
+                                   stdin=subprocess.DEVNULL, capture_output=True, text=True)
+                if p.returncode not in (0, 1) or p.stderr: sys.exit(f"pms.py {' '.join(a)}:\n{p.stderr}")
+                return sorted(p.stdout.splitlines()[1:])    # without header
+            tq, a = timeit(lambda: run("-q", query), args.n)
+            to, b = timeit(lambda: run(*opts), args.n)
+            print(f" »{query}« vs. {' '.join(opts)}")
+            report(" ".join(opts), to)
+            report("-q", tq, to)
+            print(f"  {len(a)} rows, {'identical' if a == b else 'DIFFERENT'} results")
+            if a != b: sys.exit(1)
+
+
+def bench_cli(args):
+    """end-to-end latency of `pms.py` per output mode, on synthetic databases"""
+    import shutil
+    here = os.path.dirname(os.path.abspath(pms.__file__))
+    def git(*a):
+        try: return subprocess.run(["git", *a], cwd=here, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError): return ""
+    commit = git("rev-parse", "--short", "HEAD") + ("+" if git("status", "--porcelain", "pms.py") else "")
+    try:
+        with open(args.history) as f: history = json.load(f)
+    except (OSError, ValueError):
+        history = []
+    last = history[-1]["results"] if history else {}
+    results = {}
+    for n in args.size or SIZES:
+        root = fixture(n)
+        with open(os.path.join(root, "local.jsonl")) as f:
+            name = min(l.split("\t", 1)[0] for l in f if not l.startswith("foreign-"))
+        env = fixture_env(root)
+        print(f"{n} packages")
+        for mode, opts in MODES.items():
+            for term in [name] if mode == "info" else args.term or ["lib"]:
+                def run():
+                    p = subprocess.run([sys.executable, "pms.py", *opts, term], cwd=here, env=env,
+                                       stdin=subprocess.DEVNULL, capture_output=True, text=True)
+                    if p.returncode not in (0, 1) or p.stderr: sys.exit(f"pms.py {' '.join(opts)} {term}:\n{p.stderr}")
+                    return p.stdout
+                def cold():
+                    shutil.rmtree(env["XDG_CACHE_HOME"], ignore_errors=True)
+                    return run()
+                tc, _ = timeit(cold, 1)
+                tw, out = timeit(run, args.n)
+                print(f" {mode} »{term}« {len(out.splitlines())} lines")
+                for kind, secs in (("cold", tc), ("warm", tw)):
+                    key = f"{n} {mode} {term} {kind}"
+                    results[key] = round(secs, 6)
+                    report(f"{kind} cache", secs, last.get(key))
+    history.append({"commit": commit, "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "python": sys.version.split()[0], "results": results})
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "w") as f: json.dump(history, f, indent=1)
+    print(f"history: {args.history}" + (f", compared with {history[-2]['commit'] or '?'} "
+                                        f"from {history[-2]['date']}" if len(history) > 1 else ""))
+
+
+def bench_tui(args):
+    """frame latency and bytes per frame of the interactive mode, in a pseudo-terminal"""
+    import pty, curses, fcntl, select, statistics, struct, termios
+    here = os.path.dirname(os.path.abspath(pms.__file__))
+    tty = "xterm-256color"
+    curses.setupterm(tty, sys.__stderr__.fileno())
+    def keys(k):
+        if k == "esc": return b"\033"
+        if k.startswith("wheel"):    # at row 5, SGR- or X10-encoded, as curses expects it
+            b = 64 if k == "wheelup" else 65
+            return f"\033[<{b};10;5M".encode() if curses.tigetstr("kmous") == b"\033[<" else bytes([27, 91, 77, 32 + b, 42, 37])
+        return curses.tigetstr(k)
+    def resize(cols, rows, fd):
+        fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+    def read(fd, quiet=QUIET):
+        """output until there was none for quiet seconds (PATIENCE before the first) or pms.py exited: [(time, data)]"""
+        out = []
+        while select.select([fd], [], [], quiet if out else PATIENCE)[0]:
+            try: data = os.read(fd, 65536)
+            except OSError: data = b""     # EIO: pms.py has exited
+            if not data: break
+            out.append((time.perf_counter(), data))
+        return out
+    def frames(out):
+        """split output into frames: [(time of last byte, number of bytes)]"""
+        res = []
+        for t, data in out:
+            if res and t - res[-1][0] < FRAMEGAP: res[-1] = t, res[-1][1] + len(data)
+            else: res.append((t, len(data)))
+        return res
+    for n in args.size or [15000]:
+        root = fixture(n)
+        term = (args.term or ["."])[0]
+        steps = {}
+        def measure(name, t0, out):
+            f = frames(out)
+            steps.setdefault(name, []).append((f[0][0] - t0 if f else None, f[-1][0] - t0 if f else None,
+                                               len(f), sum(b for _, b in f)))
+        t0 = time.perf_counter()
+        pid, fd = pty.fork()
+        if pid == 0:
+            resize(*TTY, 0)
+            os.chdir(here)
+            os.execve(sys.executable, [sys.executable, "pms.py", term],
+                      fixture_env(root, TERM=tty, PMS_TIMINGS="json"))
+        measure("start", t0, read(fd, 4 * QUIET))   # results arrive in several frames
+        for name, seq in SCRIPT:
+            t0 = time.perf_counter()
+            if "x" in seq[0] and seq[0].replace("x", "").isdigit():
+                resize(*map(int, seq[0].split("x")), fd)
+            else:
+                os.write(fd, b"".join(map(keys, seq)))
+            measure(name, t0, read(fd))
+        os.write(fd, keys("esc"))
+        tail = b"".join(d for _, d in read(fd)).decode(errors="replace")
+        os.waitpid(pid, 0)
+        os.close(fd)
+        print(f"{n} packages, »{term}«")
+        # latency: until the first frame is complete, settle: the last one
+        print(f"  {'step':<16} {'frames':>6} {'bytes/frame':>12} {'latency ms':>11} {'(max)':>9} {'settle ms':>10}")
+        for name, res in steps.items():
+            lat = [l * 1000 for l, _, _, _ in res if l is not None] or [0]
+            settle = [s * 1000 for _, s, _, _ in res if s is not None] or [0]
+            nf, nb = sum(r[2] for r in res), sum(r[3] for r in res)
+            print(f"  {name:<16} {nf:>6} {nb // nf if nf else 0:>12} "
+                  f"{statistics.median(lat):>11.2f} {max(lat):>9.2f} {statistics.median(settle):>10.2f}")
+        timings = [l[l.find('{"'):] for l in tail.splitlines() if '{"' in l]    # after curses' escapes
+        if not timings: sys.exit(f"pms.py failed:\n{tail}")
+        for stage, t in json.loads(timings[-1]).items():
+            if stage in ("display", "_formatize", "info", "filelist"):
+                print(f"  {stage + '()':<16} {t['calls']:>6} calls, {t['wall'] / t['calls'] * 1000:9.2f} ms each (in pms.py)")
+
+
+if __name__ == '__main__':
+    benchmarks = {k[6:]: v for k, v in globals().items() if k.startswith("bench_")}
+    parser = argparse.ArgumentParser(description="Benchmarks for pms.py")
+    parser.add_argument("-n", type=int, default=3, help="repetitions, best time is reported")
+    parser.add_argument("-s", "--size", type=int, action="append", help=f"""
+        apt, query, cli, tui: number of packages in the synthetic databases, can be given
+        more than once (default: {', '.join(map(str, SIZES))}; {', '.join(map(str, SIZES[:2]))}
+        for apt and query; 15000 for tui)""")
+    parser.add_argument("--history", default=pms.cachefile("bench/history.json"), help="""
+        cli: JSON file the results are added to (default: %(default)s)""")
+    parser.add_argument("bench", choices=benchmarks, help="; ".join(
+        f"{k}: {v.__doc__}" for k, v in benchmarks.items()))
+    parser.add_argument("term", nargs="*", help="searchterms to use")
+    args = parser.parse_intermixed_args()
+    benchmarks[args.bench](args)